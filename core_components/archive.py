@@ -0,0 +1,350 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import List, Optional, Set
+from core_components.database import ConnectDB
+
+
+class YearArchive:
+    def __init__(self, db_operations: ConnectDB) -> None:
+        """
+        Initializes class with database connection and the `archive` section of the db config.
+
+        Closed years of a table are moved to per-year archive tables, recorded in `archive_partitions`. A union view
+        of the live table and its archive tables is read by views that need all rows, and views reading only the live
+        table are used when a query's date range doesn't overlap any archived year, so archive tables are never read.
+        Year-end summaries are saved when a year is archived, and never recomputed as archived rows can't change.
+
+        Parameters
+        ----------
+        db_operations: ConnectDB
+            Initialized class variable of type ConnectDB.
+
+        Returns
+        ----------
+        `None`
+        """
+        self.db_operations = db_operations
+        self.archive_config = db_operations.db_config_dict.get("archive", {})
+        self.partitions = None
+
+    def archived_years(self, table_name: str = "cashflow_transactions") -> List[int]:
+        """
+        Get archived years of a table, read once from `archive_partitions` and kept in memory.
+
+        Parameters
+        ----------
+        table_name: str, default="cashflow_transactions"
+            Name of archived table.
+
+        Returns
+        -------
+        `List[int]` with archived years in ascending order.
+        """
+        if self.partitions is None:
+            if not self.db_operations.table_exists("archive_partitions"):
+                self.partitions = pd.DataFrame(columns=["source_table", "archive_year"])
+            else:
+                partitions_df = self.db_operations.table_query(
+                    "SELECT source_table, archive_year FROM archive_partitions ORDER BY archive_year"
+                )
+                if partitions_df is None:
+                    return []
+                self.partitions = partitions_df
+        return (
+            self.partitions[self.partitions["source_table"] == table_name][
+                "archive_year"
+            ]
+            .astype(int)
+            .to_list()
+        )
+
+    def year_condition(self, table_name: str, year: int) -> str:
+        """
+        Get SQL condition selecting rows of a table dated in a year.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of archived table.
+
+        year: int
+            Year to select.
+
+        Returns
+        -------
+        `str` with SQL condition, in the storage format of the date column.
+        """
+        date_col = self.archive_config[table_name]["date_col"]
+        return (
+            f"{date_col} >= {self.db_operations.date_literal(f'{year}-01-01', date_col)} "
+            f"AND {date_col} < {self.db_operations.date_literal(f'{year + 1}-01-01', date_col)}"
+        )
+
+    def union_view_queries(self, table_name: str) -> List[str]:
+        """
+        Get queries to recreate the union view of a table and its archive tables.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of archived table.
+
+        Returns
+        -------
+        `List[str]` with DROP and CREATE VIEW queries.
+        """
+        view_name = self.archive_config[table_name]["union_view"]
+        # Columns are listed explicitly, so all union arms keep the live table column order.
+        columns = ", ".join(self.db_operations.table_columns(table_name))
+        selects = [f"SELECT {columns} FROM {table_name}"] + [
+            f"SELECT {columns} FROM {table_name}_archive_{year}"
+            for year in self.archived_years(table_name)
+        ]
+        return [
+            f"DROP VIEW IF EXISTS {view_name}",
+            f"CREATE VIEW {view_name} AS {' UNION ALL '.join(selects)}",
+        ]
+
+    def partitioned_view_queries(self, table_name: str) -> List[str]:
+        """
+        Get queries to recreate views that sum a table and each of its archive tables separately.
+        Each placeholder in the view definition is replaced by one subquery per table, so filters on outer columns
+        are applied through the indexes of each table, instead of scanning the union view for every outer row.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of archived table.
+
+        Returns
+        -------
+        `List[str]` with DROP and CREATE VIEW queries.
+        """
+        tables = [table_name] + [
+            f"{table_name}_archive_{year}" for year in self.archived_years(table_name)
+        ]
+        queries = []
+        for view_name, placeholders in self.archive_config[table_name][
+            "partitioned_views"
+        ].items():
+            view_query = self.db_operations.db_config_dict["views"][view_name].format(
+                **{
+                    placeholder: " + ".join(
+                        term.format(partition=table) for table in tables
+                    )
+                    for placeholder, term in placeholders.items()
+                }
+            )
+            queries += [f"DROP VIEW IF EXISTS {view_name}", view_query]
+        return queries
+
+    def create_archive_views(self) -> bool:
+        """
+        Create union views and partitioned views of all archived tables, views reading union views must be created
+        afterwards.
+
+        Returns
+        -------
+        `True` if views are created successfully, `False` otherwise.
+        """
+        queries = []
+        for table_name in self.archive_config:
+            queries += self.union_view_queries(table_name)
+            queries += self.partitioned_view_queries(table_name)
+        return self.db_operations.multi_raw_query(queries) is not None
+
+    def prune_view(self, view_name: str, windows: List) -> str:
+        """
+        Get the view to query for rows within date windows, skipping archive tables when no window overlaps them.
+
+        Parameters
+        ----------
+        view_name: str
+            Name of view reading the union view, e.g. `detailed_transactions`.
+
+        windows: List
+            List of `[start, end]` dates, `start` is inclusive and `end` is exclusive. `None` end is unbounded.
+
+        Returns
+        -------
+        `str` with name of the live view if no archived year is within the windows, `view_name` otherwise.
+        """
+        for table_name, table_config in self.archive_config.items():
+            if view_name not in table_config["pruned_views"]:
+                continue
+            for start, end in windows:
+                start_year = pd.Timestamp(start).year
+                end_year = (
+                    (pd.Timestamp(end) - pd.Timedelta(days=1)).year
+                    if end is not None
+                    else None
+                )
+                if any(
+                    start_year <= year and (end_year is None or year <= end_year)
+                    for year in self.archived_years(table_name)
+                ):
+                    return view_name
+            return table_config["pruned_views"][view_name]
+        return view_name
+
+    def archivable_years(self, table_name: str = "cashflow_transactions") -> List[int]:
+        """
+        Get closed years that can be archived, i.e. years before the current year with rows in the live table.
+
+        Parameters
+        ----------
+        table_name: str, default="cashflow_transactions"
+            Name of archived table.
+
+        Returns
+        -------
+        `List[int]` with years in ascending order.
+        """
+        date_col = self.archive_config[table_name]["date_col"]
+        # Only years before the current year are read, through the date index of the live table.
+        years_df = self.db_operations.table_query(
+            f"""SELECT DISTINCT CAST(strftime('%Y', {self.db_operations.date_expression(date_col)}) AS INTEGER) AS year
+            FROM {table_name} WHERE {date_col} < {self.db_operations.date_literal(f'{date.today().year}-01-01', date_col)}
+            ORDER BY year"""
+        )
+        if years_df is None:
+            return []
+        archived = self.archived_years(table_name)
+        return [int(year) for year in years_df["year"].dropna() if year not in archived]
+
+    def archive_year(
+        self, year: int, table_name: str = "cashflow_transactions"
+    ) -> bool:
+        """
+        Move rows of a closed year to an archive table and save its year-end summary, in a single transaction.
+        Delete triggers of the live table are suspended while rows are moved, so moving rows isn't logged as deleting
+        them, and merchant usage and reconciliation checkpoints are unchanged. The `balance_check` query is run before
+        and after moving rows, and the transaction is rolled back if its results differ.
+
+        Parameters
+        ----------
+        year: int
+            Year to archive, must be before the current year and have no open rows, e.g. pending transactions.
+
+        table_name: str, default="cashflow_transactions"
+            Name of archived table.
+
+        Returns
+        -------
+        `True` if archived successfully, `False` if the year can't be archived or any errors.
+        """
+        table_config = self.archive_config[table_name]
+        if year >= date.today().year or year in self.archived_years(table_name):
+            return False
+        year_condition = self.year_condition(table_name, year)
+        open_rows = self.db_operations.table_query(
+            f"SELECT COUNT(*) AS open_rows FROM {table_name} WHERE {year_condition} AND {table_config['open_condition']}"
+        )
+        if open_rows is None or open_rows["open_rows"][0] > 0:
+            return False
+        if not self.db_operations.table_create("archive_partitions") or not (
+            self.db_operations.table_create("archive_year_summaries")
+        ):
+            return False
+
+        archive_table = f"{table_name}_archive_{year}"
+        id_field = self.db_operations.db_config_dict["triggers"][table_name]["id_field"]
+        suspended_triggers = table_config["suspended_triggers"]
+        queries = [
+            table_config["balance_check"],
+            f"CREATE TABLE {archive_table} AS SELECT * FROM {table_name} WHERE 0",
+            f"CREATE UNIQUE INDEX idx_{archive_table}_id ON {archive_table} ({id_field})",
+        ]
+        queries += [
+            f"CREATE INDEX idx_{archive_table}_{'_'.join(cols)} ON {archive_table} ({', '.join(cols)})"
+            for cols in table_config["index_cols"]
+        ]
+        queries += [f"DROP TRIGGER IF EXISTS delete_event_{table_name}"] + [
+            f"DROP TRIGGER IF EXISTS {trigger}" for trigger in suspended_triggers
+        ]
+        queries += [
+            f"INSERT INTO {archive_table} SELECT * FROM {table_name} WHERE {year_condition}",
+            table_config["summary"].format(year=int(year), archive_table=archive_table),
+            f"""INSERT INTO archive_partitions (source_table, archive_year, archive_table, row_count)
+            SELECT '{table_name}', {int(year)}, '{archive_table}', COUNT(*) FROM {archive_table}""",
+            f"DELETE FROM {table_name} WHERE {year_condition}",
+        ]
+        queries += self.db_operations.table_trigger_queries(table_name) + [
+            self.db_operations.db_config_dict["index_triggers"][trigger]
+            for trigger in suspended_triggers
+        ]
+        # Union and partitioned views are recreated with the new archive table in the same transaction.
+        self.partitions = pd.concat(
+            [
+                self.partitions,
+                pd.DataFrame({"source_table": [table_name], "archive_year": [year]}),
+            ],
+            ignore_index=True,
+        )
+        queries += (
+            self.union_view_queries(table_name)
+            + self.partitioned_view_queries(table_name)
+            + [table_config["balance_check"]]
+        )
+
+        def balances_unchanged(results: List[pd.DataFrame]) -> bool:
+            before, after = results[0], results[-1]
+            return before.shape == after.shape and np.allclose(
+                before.to_numpy(dtype=np.float64),
+                after.to_numpy(dtype=np.float64),
+                rtol=0,
+                atol=1e-6,
+            )
+
+        if (
+            self.db_operations.multi_raw_query(queries, validate=balances_unchanged)
+            is None
+        ):
+            self.partitions = None
+            return False
+        return True
+
+    def archived_ids(
+        self, ids: List[int], table_name: str = "cashflow_transactions"
+    ) -> Set[int]:
+        """
+        Get ids of rows that are archived, i.e. no longer in the live table. Archived rows are read-only.
+
+        Parameters
+        ----------
+        ids: List[int]
+            Ids of rows to check.
+
+        table_name: str, default="cashflow_transactions"
+            Name of archived table.
+
+        Returns
+        -------
+        `Set[int]` with archived ids, empty if no years are archived or any errors.
+        """
+        ids = [int(id) for id in ids if not pd.isnull(id)]
+        if len(ids) == 0 or len(self.archived_years(table_name)) == 0:
+            return set()
+        id_field = self.db_operations.db_config_dict["triggers"][table_name]["id_field"]
+        live_df = self.db_operations.table_query(
+            f"SELECT {id_field} FROM {table_name} WHERE {id_field} IN ({', '.join(str(id) for id in ids)})"
+        )
+        if live_df is None:
+            return set()
+        return set(ids) - set(live_df[id_field].astype(int))
+
+    def year_summaries(self) -> Optional[pd.DataFrame]:
+        """
+        Get frozen year-end summaries of archived years, for each account.
+
+        Returns
+        -------
+        `pd.DataFrame` with summary columns and `account_name`. `None` if no years are archived or any errors.
+        """
+        if not self.db_operations.table_exists("archive_year_summaries"):
+            return None
+        return self.db_operations.table_query(
+            """SELECT S.*, A.account_name FROM archive_year_summaries S
+            LEFT JOIN accounts A ON A.account_id = S.account_id ORDER BY S.archive_year, A.account_name"""
+        )
@@ -0,0 +1,382 @@
+import os
+import toml
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Optional
+from core_components.database import ConnectDB
+
+
+def epoch_days(dates: pd.Series) -> np.ndarray:
+    """
+    Convert dates to the number of days since 1970-01-01.
+
+    Parameters
+    ----------
+    dates: pd.Series
+        Series with ISO date strings or datetime values.
+
+    Returns
+    -------
+    `np.ndarray` of int64 day numbers.
+    """
+    return (
+        pd.to_datetime(dates, format="ISO8601")
+        .to_numpy()
+        .astype("datetime64[D]")
+        .astype(np.int64)
+    )
+
+
+class BalanceHistory:
+    def __init__(
+        self,
+        db_operations: ConnectDB,
+        config_path: str = ".streamlit/secrets.toml",
+    ) -> None:
+        """
+        Initializes class with database connection and cache file for the daily account balance matrix.
+        Values are read from the `balance_history` section of the toml config, defaults are used otherwise.
+
+        The matrix has one row per day, from the first transaction date to today (or the last transaction date if later),
+        and one column per account, with balances in the account currency. It is saved as a numpy array file and
+        extended using the `event_logs` change feed since it was last built, so new transactions only add their own changes.
+        Transactions are read from the union view of live and archived years, see `YearArchive`.
+        When money columns are stored as integer minor units, see `ConnectDB.set_money_storage()`, the matrix holds
+        int64 minor units and sums are exact, balances are converted to currency units when read.
+
+        Parameters
+        ----------
+        db_operations: ConnectDB
+            Initialized class variable of type ConnectDB.
+
+        config_path: str, default=".streamlit/secrets.toml"
+            Path of toml config with the `balance_history` section.
+
+        Returns
+        ----------
+        `None`
+        """
+        try:
+            config = toml.load(config_path).get("balance_history", {})
+        except Exception as e:
+            print(e)
+            config = {}
+        self.db_operations = db_operations
+        self.cache_dir = config.get("cache_dir", "files/balance_history")
+        self.cache_path = os.path.join(self.cache_dir, "balance_history.npz")
+        self.history = None
+
+    def _money_dtype(self) -> type:
+        """
+        Get the dtype of the balance matrix for the storage format of money columns.
+
+        Returns
+        -------
+        `np.int64` if money is stored as integer minor units, `np.float64` otherwise.
+        """
+        return np.float64 if self.db_operations.money_scale is None else np.int64
+
+    def _to_money(self, values: pd.Series) -> np.ndarray:
+        """
+        Convert stored money values to the dtype of the balance matrix.
+
+        Parameters
+        ----------
+        values: pd.Series
+            Series with money values as stored in the database.
+
+        Returns
+        -------
+        `np.ndarray` of int64 minor units or float64 values.
+        """
+        values = pd.to_numeric(values).fillna(0).to_numpy(dtype=np.float64)
+        if self._money_dtype() is np.int64:
+            return np.rint(values).astype(np.int64)
+        return values
+
+    def _daily_changes(
+        self,
+        transactions_df: pd.DataFrame,
+        start_day: int,
+        day_count: int,
+        account_ids: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Pivot transactions into a matrix of daily totals for each account.
+
+        Parameters
+        ----------
+        transactions_df: pd.DataFrame
+            DataFrame with `transaction_account_id`, `transaction_date` and `transaction_amount` columns.
+
+        start_day: int
+            Day number of the first matrix row.
+
+        day_count: int
+            Number of matrix rows.
+
+        account_ids: np.ndarray
+            Account ids of the matrix columns, transactions of other accounts are ignored.
+
+        Returns
+        -------
+        `np.ndarray` with shape (day_count, len(account_ids)) and summed transaction amounts.
+        """
+        dtype = self._money_dtype()
+        daily_df = pd.DataFrame(
+            {
+                "day": epoch_days(transactions_df["transaction_date"]) - start_day,
+                "account_id": transactions_df["transaction_account_id"].to_numpy(),
+                "amount": self._to_money(transactions_df["transaction_amount"]),
+            }
+        ).pivot_table(
+            index="day",
+            columns="account_id",
+            values="amount",
+            aggfunc="sum",
+            fill_value=0,
+        )
+        return daily_df.reindex(
+            index=range(day_count), columns=account_ids, fill_value=0
+        ).to_numpy(dtype=dtype)
+
+    def _build(self) -> Optional[dict]:
+        """
+        Build the balance matrix from all transactions, starting from `account_starting_balance` of each account.
+
+        Returns
+        -------
+        `dict` with `start_day`, `account_ids`, `balances`, `last_event_id` and `money_scale`. `None` if any errors.
+        """
+        results = self.db_operations.multi_table_query(
+            {
+                "last_event": "SELECT IFNULL(MAX(event_id), 0) AS last_event_id FROM event_logs",
+                "accounts": "SELECT account_id, account_starting_balance FROM accounts ORDER BY account_id",
+                "transactions": "SELECT transaction_account_id, transaction_date, transaction_amount FROM cashflow_transactions_all",
+            },
+            decode_money=False,
+        )
+        if any(df is None for df in results.values()):
+            return None
+        transactions_df = results["transactions"]
+        account_ids = results["accounts"]["account_id"].to_numpy(dtype=np.int64)
+        today = int(np.datetime64(date.today(), "D").astype(np.int64))
+        if len(transactions_df) > 0:
+            days = epoch_days(transactions_df["transaction_date"])
+            start_day, end_day = int(days.min()), max(int(days.max()), today)
+        else:
+            start_day, end_day = today, today
+        day_count = end_day - start_day + 1
+        balances = self._to_money(
+            results["accounts"]["account_starting_balance"]
+        ) - np.cumsum(
+            self._daily_changes(transactions_df, start_day, day_count, account_ids),
+            axis=0,
+        )
+        return {
+            "start_day": start_day,
+            "account_ids": account_ids,
+            "balances": balances,
+            "last_event_id": int(results["last_event"]["last_event_id"][0]),
+            "money_scale": self.db_operations.money_scale or 0,
+        }
+
+    def _extend(self, history: dict) -> Optional[dict]:
+        """
+        Extend the balance matrix with transactions inserted since it was built, and with days up to today.
+
+        Parameters
+        ----------
+        history: dict
+            Balance matrix, as returned by `_build()`.
+
+        Returns
+        -------
+        `dict` with the extended balance matrix. `None` if it can't be extended, e.g. transactions were changed,
+        deleted or dated before the first day, accounts were changed or money storage was migrated.
+        """
+        if history["money_scale"] != (self.db_operations.money_scale or 0):
+            return None
+        feed = self.db_operations.changed_keys(
+            history["last_event_id"], tables=["cashflow_transactions", "accounts"]
+        )
+        if feed is None or not feed["complete"]:
+            return None
+        changes_df = feed["changes"]
+        if (
+            (changes_df["event_table"] != "cashflow_transactions")
+            | (changes_df["first_event_type"] != "INSERT")
+            | (changes_df["last_event_type"] != "INSERT")
+        ).any():
+            return None
+        # Rows changed after the feed was read have later events, so they are handled by the next refresh.
+        transactions_df = pd.DataFrame(
+            columns=["transaction_account_id", "transaction_date", "transaction_amount"]
+        )
+        if len(changes_df) > 0:
+            transaction_ids = ", ".join(
+                str(int(id)) for id in changes_df["event_foreign_key"]
+            )
+            transactions_df = self.db_operations.multi_table_query(
+                {
+                    "transactions": f"""SELECT transaction_account_id, transaction_date, transaction_amount
+                    FROM cashflow_transactions_all WHERE transaction_id IN ({transaction_ids})""",
+                },
+                decode_money=False,
+            )["transactions"]
+            if transactions_df is None:
+                return None
+
+        start_day, balances = history["start_day"], history["balances"]
+        today = int(np.datetime64(date.today(), "D").astype(np.int64))
+        end_day = max(start_day + len(balances) - 1, today)
+        if len(transactions_df) > 0:
+            days = epoch_days(transactions_df["transaction_date"])
+            if days.min() < start_day:
+                return None
+            end_day = max(end_day, int(days.max()))
+        day_count = end_day - start_day + 1
+        if day_count > len(balances):
+            # Balances are unchanged on days without transactions.
+            balances = np.concatenate(
+                [
+                    balances,
+                    np.repeat(balances[-1:], day_count - len(balances), axis=0),
+                ]
+            )
+        if len(transactions_df) > 0:
+            balances = balances - np.cumsum(
+                self._daily_changes(
+                    transactions_df, start_day, day_count, history["account_ids"]
+                ),
+                axis=0,
+            )
+        return {
+            **history,
+            "balances": balances,
+            "last_event_id": feed["last_event_id"],
+        }
+
+    def _load(self) -> Optional[dict]:
+        """
+        Load the balance matrix from memory, or from the cache file.
+
+        Returns
+        -------
+        `dict` with the balance matrix. `None` if not cached or any errors.
+        """
+        if self.history is not None:
+            return self.history
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with np.load(self.cache_path) as cached:
+                return {
+                    "start_day": int(cached["start_day"]),
+                    "account_ids": cached["account_ids"],
+                    "balances": cached["balances"],
+                    "last_event_id": int(cached["last_event_id"]),
+                    "money_scale": int(cached["money_scale"]),
+                }
+        except Exception as e:
+            print(e)
+            return None
+
+    def _save(self, history: dict) -> bool:
+        """
+        Save the balance matrix to the cache file.
+
+        Parameters
+        ----------
+        history: dict
+            Balance matrix to save.
+
+        Returns
+        -------
+        `True` if saved successfully, `False` otherwise.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written to a temporary file first, so an interrupted write never leaves a partial cache.
+            temp_path = f"{self.cache_path}.tmp.npz"
+            np.savez(temp_path, **history)
+            os.replace(temp_path, self.cache_path)
+            return True
+        except Exception as e:
+            print(e)
+            return False
+
+    def refresh(self) -> Optional[dict]:
+        """
+        Get the up to date balance matrix, extending the cached matrix when possible and rebuilding it otherwise.
+
+        Returns
+        -------
+        `dict` with `start_day`, `account_ids`, `balances`, `last_event_id` and `money_scale`. `None` if any errors.
+        """
+        history = self._load()
+        extended = self._extend(history) if history is not None else None
+        if extended is None:
+            extended = self._build()
+            if extended is None:
+                return None
+        if (
+            history is None
+            or extended["last_event_id"] != history["last_event_id"]
+            or len(extended["balances"]) != len(history["balances"])
+        ):
+            self._save(extended)
+        self.history = extended
+        return extended
+
+    def balances(
+        self,
+        accounts_df: pd.DataFrame,
+        conversion_rates: Optional[pd.Series] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get daily balances for each account.
+
+        Parameters
+        ----------
+        accounts_df: pd.DataFrame
+            DataFrame with `account_id` and `account_name` of accounts to include.
+
+        conversion_rates: Optional[pd.Series], default=None
+            Conversion rates to the base currency, indexed by `account_id`. Balances are in account currency if `None`.
+            Accounts without a rate are left out.
+
+        Returns
+        -------
+        `pd.DataFrame` with a row per day, indexed by date, and a column per account name. `None` if any errors.
+        """
+        history = self.refresh()
+        if history is None:
+            return None
+        account_ids = accounts_df["account_id"].to_numpy(dtype=np.int64)
+        columns = np.searchsorted(history["account_ids"], account_ids)
+        columns = np.clip(columns, 0, max(len(history["account_ids"]) - 1, 0))
+        found = (
+            history["account_ids"][columns] == account_ids
+            if len(history["account_ids"]) > 0
+            else np.zeros(len(account_ids), dtype=bool)
+        )
+        if conversion_rates is not None:
+            rates = conversion_rates.reindex(account_ids).to_numpy(dtype=np.float64)
+            found &= ~np.isnan(rates)
+        balances = history["balances"][:, columns[found]].astype(np.float64)
+        if history["money_scale"]:
+            balances = balances / history["money_scale"]
+        if conversion_rates is not None:
+            balances = balances * rates[found]
+        dates = pd.to_datetime(
+            np.arange(
+                history["start_day"], history["start_day"] + len(balances)
+            ).astype("datetime64[D]")
+        )
+        return pd.DataFrame(
+            balances,
+            index=pd.Index(dates, name="date"),
+            columns=accounts_df["account_name"].to_numpy()[found],
+        )
@@ -2,8 +2,10 @@ from sqlalchemy.sql import text
 from sqlalchemy import create_engine
 import json
 import toml
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import re
 
 
@@ -21,12 +23,22 @@ class ConnectDB:
         ----------
         `None`
         """
-        self.source_dict = toml.load(".streamlit/secrets.toml")["connections"][db_name]
+        config = toml.load(".streamlit/secrets.toml")
+        self.source_dict = config["connections"][db_name]
+        self.event_log_config = config.get("event_logs", {})
         if "url" in self.source_dict:
             self.engine = create_engine(self.source_dict["url"])
         self.db_config_path = "files/db_config.json"
         with open(self.db_config_path) as f:
             self.db_config_dict = json.load(f)
+        self.table_columns_cache = {}
+        self.money_columns = set(self.db_config_dict.get("money_columns", []))
+        self.date_columns = self.db_config_dict.get("date_columns", {})
+        # Storage settings are read after defaults are set, as reading them decodes query results.
+        self.money_scale = None
+        self.epoch_dates = False
+        self.money_scale = self.get_money_scale()
+        self.epoch_dates = self.get_db_settings().get("date_storage") == "epoch"
 
     def raw_query(self, query: str) -> bool:
         """
@@ -51,6 +63,444 @@ class ConnectDB:
             print(e)
             return False
 
+    def get_db_settings(self) -> Dict[str, str]:
+        """
+        Get storage settings saved in the `db_settings` table.
+
+        Returns
+        -------
+        `Dict[str, str]` with setting names and values, empty if the table doesn't exist or any errors.
+        """
+        try:
+            if not self.table_exists("db_settings"):
+                return {}
+            return (
+                self.table_query("SELECT setting_name, setting_value FROM db_settings")
+                .set_index("setting_name")["setting_value"]
+                .to_dict()
+            )
+        except Exception as e:
+            print(e)
+            return {}
+
+    def get_money_scale(self) -> Optional[int]:
+        """
+        Get the number of minor units per currency unit, when money columns are stored as integer minor units.
+        Uses the `money_storage` and `money_decimals` settings in the `db_settings` table, see `set_money_storage()`.
+
+        Returns
+        -------
+        `int` with minor units per currency unit, `None` if money columns are stored as decimals or any errors.
+        """
+        try:
+            settings = self.get_db_settings()
+            if settings.get("money_storage") != "minor_units":
+                return None
+            return 10 ** int(settings["money_decimals"])
+        except Exception as e:
+            print(e)
+            return None
+
+    def partition_tables(self, table_name: str) -> List[str]:
+        """
+        Get archive tables holding closed years of a table, see `YearArchive.archive_year()`.
+        Archive tables have the same columns as the table, so storage migrations also convert them.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table in `self.db_config_dict`.
+
+        Returns
+        -------
+        `List[str]` with names of archive tables, empty if none or any errors.
+        """
+        try:
+            if not self.table_exists("archive_partitions"):
+                return []
+            return self.table_query(
+                f"SELECT archive_table FROM archive_partitions WHERE source_table = '{table_name}'"
+            )["archive_table"].to_list()
+        except Exception as e:
+            print(e)
+            return []
+
+    def encode_money(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert money columns of a DataFrame to the storage format, integer minor units if enabled.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame with values to be written to the database.
+
+        Returns
+        -------
+        `pd.DataFrame` with converted money columns, input is returned unchanged if stored as decimals.
+        """
+        money_cols = [col for col in df.columns if col in self.money_columns]
+        if self.money_scale is None or len(money_cols) == 0:
+            return df
+        df = df.copy()
+        for col in money_cols:
+            values = pd.to_numeric(df[col])
+            # Python ints and None, so values are written as integers and NULL.
+            df[col] = (
+                (values * self.money_scale)
+                .round()
+                .astype("Int64")
+                .astype(object)
+                .where(values.notna(), None)
+            )
+        return df
+
+    def decode_money(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        Convert money columns of a DataFrame read from the database to decimal currency units.
+
+        Parameters
+        ----------
+        df: Optional[pd.DataFrame]
+            DataFrame with query results.
+
+        Returns
+        -------
+        `pd.DataFrame` with converted money columns, input is returned unchanged if stored as decimals.
+        """
+        if self.money_scale is None or not isinstance(df, pd.DataFrame):
+            return df
+        for col in df.columns:
+            if col in self.money_columns:
+                df[col] = pd.to_numeric(df[col]).astype(np.float64) / self.money_scale
+        return df
+
+    def update_trigger_queries(
+        self, epoch_dates: Optional[bool] = None
+    ) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Get queries to suspend and restore update triggers in the database, for storage migrations rewriting all rows.
+        Rewriting rows isn't logged as changing them, and merchant usage and reconciliation checkpoints are unchanged.
+        Only triggers existing in the database are suspended and restored.
+
+        Parameters
+        ----------
+        epoch_dates: Optional[bool], default=None
+            Date storage of restored event log triggers, current date storage if `None`, see `table_trigger_queries()`.
+
+        Returns
+        -------
+        `Tuple[List[str], List[str]]` with queries to run before and after rewriting rows, in the same transaction.
+        `None` if any errors.
+        """
+        event_triggers = {
+            f"update_event_{table_name}": table_name
+            for table_name in self.db_config_dict["triggers"]
+        }
+        index_triggers = [
+            trigger
+            for trigger, query in self.db_config_dict["index_triggers"].items()
+            if " AFTER UPDATE " in query
+        ]
+        existing_df = self.table_query(
+            f"""SELECT name FROM sqlite_master WHERE type = 'trigger'
+            AND name IN ({", ".join(f"'{trigger}'" for trigger in [*event_triggers, *index_triggers])})"""
+        )
+        if existing_df is None:
+            return None
+        existing = set(existing_df["name"])
+        suspend_queries = [
+            f"DROP TRIGGER IF EXISTS {trigger}"
+            for trigger in [*event_triggers, *index_triggers]
+            if trigger in existing
+        ]
+        restore_queries = []
+        for trigger, table_name in event_triggers.items():
+            if trigger in existing:
+                restore_queries += self.table_trigger_queries(
+                    table_name, epoch_dates=epoch_dates
+                )
+        restore_queries += [
+            self.db_config_dict["index_triggers"][trigger]
+            for trigger in index_triggers
+            if trigger in existing
+        ]
+        return suspend_queries, restore_queries
+
+    def set_money_storage(self, decimals: Optional[int]) -> bool:
+        """
+        Migrate money columns of all tables between decimal and integer minor unit storage, in a single transaction.
+        Sums of minor units are exact, so balances and totals calculated in the database don't accumulate rounding errors.
+        Update triggers are suspended while amounts are converted, so reconciliation checkpoints are rescaled instead of
+        deleted, see `update_trigger_queries()`.
+
+        Parameters
+        ----------
+        decimals: Optional[int]
+            Number of decimal digits stored as minor units, e.g. 2 for cents. `None` to store decimals.
+
+        Returns
+        -------
+        `True` if migrated successfully, `False` otherwise.
+        """
+        new_scale = None if decimals is None else 10 ** int(decimals)
+        if new_scale == self.money_scale:
+            return True
+        old_scale = self.money_scale or 1
+        old_decimals = len(str(old_scale)) - 1
+        # Minor units are rounded to integers, decimals are rounded to the digits previously stored.
+        round_digits = 0 if new_scale else old_decimals
+        trigger_queries = self.update_trigger_queries()
+        if trigger_queries is None:
+            return False
+        queries, restore_queries = trigger_queries
+        for table_name, table_config in self.db_config_dict["tables"].items():
+            money_cols = [col for col in table_config if col in self.money_columns]
+            if len(money_cols) == 0 or not self.table_exists(table_name):
+                continue
+            set_str = ", ".join(
+                f"{col} = ROUND({col} * {new_scale or 1} / {old_scale}.0, {round_digits})"
+                for col in money_cols
+            )
+            for target_table in [table_name] + self.partition_tables(table_name):
+                queries.append(f"UPDATE {target_table} SET {set_str}")
+        queries += restore_queries + [
+            f"""INSERT INTO db_settings (setting_name, setting_value) VALUES
+            ('money_storage', '{"minor_units" if new_scale else "decimal"}'), ('money_decimals', '{int(decimals or 0)}')
+            ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value""",
+        ]
+        if not self.table_create("db_settings"):
+            return False
+        if self.multi_raw_query(queries) is None:
+            return False
+        self.money_scale = new_scale
+        return True
+
+    def encode_date(self, value: Any, column: str) -> Optional[int | str]:
+        """
+        Convert a date to the storage format of a date column.
+        Epoch dates are stored as days since 1970-01-01, or seconds for timestamp columns, see `set_date_storage()`.
+
+        Parameters
+        ----------
+        value: Any
+            Date as ISO string, date, datetime or Timestamp.
+
+        column: str
+            Name of date column in `date_columns` of the db config.
+
+        Returns
+        -------
+        `int` if dates are stored as epoch, ISO `str` otherwise. `None` for missing values.
+        """
+        if value is None or pd.isnull(value):
+            return None
+        unit = self.date_columns[column]
+        if self.epoch_dates:
+            return int(np.datetime64(pd.Timestamp(value), unit).astype(np.int64))
+        if isinstance(value, str):
+            return value
+        return pd.Timestamp(value).strftime(
+            "%Y-%m-%d" if unit == "D" else "%Y-%m-%d %H:%M:%S"
+        )
+
+    def date_literal(self, value: Any, column: str) -> str:
+        """
+        Format a date as a SQL literal in the storage format of a date column, see `encode_date()`.
+
+        Parameters
+        ----------
+        value: Any
+            Date as ISO string, date, datetime or Timestamp.
+
+        column: str
+            Name of date column in `date_columns` of the db config.
+
+        Returns
+        -------
+        `str` with SQL literal.
+        """
+        encoded = self.encode_date(value, column)
+        if encoded is None:
+            return "NULL"
+        return str(encoded) if self.epoch_dates else f"'{encoded}'"
+
+    def date_expression(self, column: str) -> str:
+        """
+        Get SQL expression reading a date column as an ISO date string, in any storage format, see `encode_date()`.
+
+        Parameters
+        ----------
+        column: str
+            Name of date column in `date_columns` of the db config.
+
+        Returns
+        -------
+        `str` with SQL expression, e.g. for use with `strftime()`.
+        """
+        if not self.epoch_dates:
+            return column
+        if self.date_columns[column] == "D":
+            return f"date({column} * 86400, 'unixepoch')"
+        return f"datetime({column}, 'unixepoch')"
+
+    def encode_dates(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert date columns of a DataFrame to epoch integers, if dates are stored as epoch.
+
+        Parameters
+        ----------
+        df: pd.DataFrame
+            DataFrame with values to be written to the database.
+
+        Returns
+        -------
+        `pd.DataFrame` with converted date columns, input is returned unchanged if dates are stored as ISO strings.
+        """
+        date_cols = [col for col in df.columns if col in self.date_columns]
+        if not self.epoch_dates or len(date_cols) == 0:
+            return df
+        df = df.copy()
+        for col in date_cols:
+            values = pd.to_datetime(df[col], format="ISO8601")
+            # Python ints and None, so values are written as integers and NULL.
+            df[col] = (
+                pd.Series(
+                    values.to_numpy()
+                    .astype(f"datetime64[{self.date_columns[col]}]")
+                    .astype(np.int64),
+                    index=df.index,
+                )
+                .astype(object)
+                .where(values.notna(), None)
+            )
+        return df
+
+    def decode_dates(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        """
+        Convert epoch date columns of a DataFrame read from the database to datetime.
+
+        Parameters
+        ----------
+        df: Optional[pd.DataFrame]
+            DataFrame with query results.
+
+        Returns
+        -------
+        `pd.DataFrame` with converted date columns, input is returned unchanged if dates are stored as ISO strings.
+        """
+        if not self.epoch_dates or not isinstance(df, pd.DataFrame):
+            return df
+        for col in df.columns:
+            if col in self.date_columns:
+                df[col] = pd.to_datetime(
+                    pd.to_numeric(df[col]), unit=self.date_columns[col]
+                )
+        return df
+
+    def set_date_storage(self, epoch: bool) -> bool:
+        """
+        Migrate date columns of all tables between ISO strings and epoch integers, in a single transaction.
+        Epoch dates are compared as numbers in range filters and indexes, and are decoded with a vectorized cast.
+        Update triggers are suspended while dates are converted, see `update_trigger_queries()`. Event log triggers are
+        recreated in the same transaction, so new events use the same timestamp format.
+
+        Parameters
+        ----------
+        epoch: bool
+            `True` to store dates as epoch integers, `False` to store ISO strings.
+
+        Returns
+        -------
+        `True` if migrated successfully, `False` otherwise.
+        """
+        if epoch == self.epoch_dates:
+            return True
+        convert = {
+            # Only values in the old format are converted, rows already changed by triggers are skipped.
+            True: {
+                "D": "CAST(julianday(date({col})) - 2440587.5 AS INTEGER) WHERE typeof({col}) = 'text'",
+                "s": "CAST(strftime('%s', {col}) AS INTEGER) WHERE typeof({col}) = 'text'",
+            },
+            False: {
+                "D": "date({col} * 86400, 'unixepoch') WHERE typeof({col}) IN ('integer', 'real')",
+                "s": "datetime({col}, 'unixepoch') WHERE typeof({col}) IN ('integer', 'real')",
+            },
+        }[epoch]
+        trigger_queries = self.update_trigger_queries(epoch_dates=epoch)
+        if trigger_queries is None:
+            return False
+        queries, restore_queries = trigger_queries
+        for table_name, table_config in self.db_config_dict["tables"].items():
+            if not self.table_exists(table_name):
+                continue
+            for target_table in [table_name] + self.partition_tables(table_name):
+                for col in table_config:
+                    if col in self.date_columns:
+                        queries.append(
+                            f"UPDATE {target_table} SET {col} = {convert[self.date_columns[col]].format(col=col)}"
+                        )
+        queries += restore_queries
+        queries.append(
+            f"""INSERT INTO db_settings (setting_name, setting_value) VALUES ('date_storage', '{"epoch" if epoch else "iso"}')
+            ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value"""
+        )
+        if (
+            not self.table_create("db_settings")
+            or self.multi_raw_query(queries) is None
+        ):
+            return False
+        self.epoch_dates = epoch
+        return True
+
+    def multi_raw_query(
+        self,
+        queries: List[str],
+        params: Optional[List[Optional[List[dict]]]] = None,
+        validate: Optional[Callable[[List[pd.DataFrame]], bool]] = None,
+    ) -> Optional[List[pd.DataFrame]]:
+        """
+        Execute several queries in a single write transaction, all changes are rolled back if any query fails.
+
+        Parameters
+        ----------
+        queries: List[str]
+            Queries to execute on the database, in order.
+
+        params: Optional[List[Optional[List[dict]]]], default=None
+            Optional bind parameters for each query. A list of dicts executes the query once for each dict
+            as a single batch, `None` executes the query once without parameters.
+
+        validate: Optional[Callable[[List[pd.DataFrame]], bool]], default=None
+            Optional check of the returned rows before committing, all changes are rolled back if it returns `False`.
+
+        Returns
+        -------
+        `List[pd.DataFrame]` with rows returned by each query (e.g. by a RETURNING clause), empty DataFrame for queries
+        not returning rows. `None` if any errors.
+        """
+        try:
+            results = []
+            with self.engine.begin() as connection:
+                if self.engine.dialect.name == "sqlite":
+                    # pysqlite only opens a transaction before DML, begin explicitly so DDL is rolled back too.
+                    connection.exec_driver_sql("BEGIN")
+                for query, query_params in zip(
+                    queries, params or [None] * len(queries)
+                ):
+                    result = connection.execute(text(query), query_params)
+                    if result.returns_rows:
+                        results.append(
+                            pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+                        )
+                    else:
+                        results.append(pd.DataFrame())
+                if validate is not None and not validate(results):
+                    raise ValueError("Transaction failed validation, rolled back.")
+            return results
+        except Exception as e:
+            print(e)
+            return None
+
     def table_create(self, table_name: str) -> bool:
         """
         Create a table it doesn't exist in the database using field definitions from `self.db_config_dict`.
@@ -115,11 +565,242 @@ class ConnectDB:
         """
         try:
             result = pd.read_sql_query(query, con=self.engine)
-            return result
+            return self.decode_dates(self.decode_money(result))
         except Exception as e:
             print(e)
             return None
 
+    def multi_table_query(
+        self,
+        queries: Dict[str, str],
+        post_process: Optional[Callable[[str, pd.DataFrame], pd.DataFrame]] = None,
+        max_workers: int = 4,
+        decode_money: bool = True,
+    ) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        Execute several queries in a single read transaction so that all results come from the same snapshot of the database.
+        Rows are fetched on one connection and decoded into DataFrames in parallel threads.
+
+        Parameters
+        ----------
+        queries: Dict[str, str]
+            Dictionary with result names and queries to be executed on the database.
+
+        post_process: Optional[Callable[[str, pd.DataFrame], pd.DataFrame]], default=None
+            Optional function applied to each decoded DataFrame, called with the result name and DataFrame.
+
+        max_workers: int, default=4
+            Maximum number of threads used to decode results.
+
+        decode_money: bool, default=True
+            Convert money columns to decimal currency units, see `decode_money()`. Set to `False` to keep stored values.
+
+        Returns
+        -------
+        `Dict[str, Optional[pd.DataFrame]]` with query results, `None` for every result if any errors.
+        """
+        if len(queries) == 0:
+            return {}
+        try:
+            raw_results = {}
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "sqlite":
+                    # pysqlite only opens a transaction before DML, begin explicitly so all reads share a snapshot.
+                    connection.exec_driver_sql("BEGIN")
+                for name, query in queries.items():
+                    result = connection.execute(text(query))
+                    raw_results[name] = (list(result.keys()), result.fetchall())
+                connection.rollback()
+        except Exception as e:
+            print(e)
+            return {name: None for name in queries}
+
+        def decode(name: str) -> Optional[pd.DataFrame]:
+            try:
+                columns, rows = raw_results[name]
+                df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                if decode_money:
+                    df = self.decode_money(df)
+                df = self.decode_dates(df)
+                return post_process(name, df) if post_process else df
+            except Exception as e:
+                print(e)
+                return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(raw_results, executor.map(decode, raw_results)))
+
+    def table_count(
+        self, table_name: str, condition: Optional[str] = None
+    ) -> Optional[int]:
+        """
+        Count rows in a table or view in the database, without loading them.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table or view in the database.
+
+        condition: Optional[str], default=None
+            Optional SQL condition to filter rows with.
+
+        Returns
+        -------
+        `int` with number of rows, `None` if any errors.
+        """
+        try:
+            where_str = f" WHERE {condition}" if condition else ""
+            result = self.table_query(
+                f"SELECT COUNT(*) as row_count FROM {table_name}{where_str}"
+            )
+            return int(result["row_count"][0])
+        except Exception as e:
+            print(e)
+            return None
+
+    def table_page_query(
+        self,
+        table_name: str,
+        sort_cols: List[str],
+        page_size: int,
+        cursor: Optional[tuple] = None,
+        condition: Optional[str] = None,
+        descending: bool = False,
+        columns: Optional[List[str]] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Query one page of a table or view in the database using keyset pagination.
+        Rows are read after the `cursor` key in `sort_cols` order, so the cost depends on page size and not on page number.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table or view in the database.
+
+        sort_cols: List[str]
+            Columns to sort by, the last column must be unique so that every row has a distinct key.
+
+        page_size: int
+            Maximum number of rows to return.
+
+        cursor: Optional[tuple], default=None
+            Values of `sort_cols` for the last row of the previous page, first page if `None`.
+
+        condition: Optional[str], default=None
+            Optional SQL condition to filter rows with.
+
+        descending: bool, default=False
+            Sort rows in descending order.
+
+        columns: Optional[List[str]], default=None
+            Columns to return, all columns if `None`.
+
+        Returns
+        -------
+        `pd.DataFrame` with page rows, `None` if any errors.
+        """
+        try:
+            conditions = [f"({condition})"] if condition else []
+            params = {}
+            if cursor is not None:
+                operator = "<" if descending else ">"
+                conditions.append(
+                    f"({', '.join(sort_cols)}) {operator} ({', '.join(f':cursor_{i}' for i in range(len(sort_cols)))})"
+                )
+                params = {
+                    f"cursor_{i}": (
+                        self.encode_date(val, col) if col in self.date_columns else val
+                    )
+                    for i, (col, val) in enumerate(zip(sort_cols, cursor))
+                }
+            select_cols = "*" if columns is None else ", ".join(columns)
+            where_str = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            order = "DESC" if descending else "ASC"
+            order_str = ", ".join(f"{col} {order}" for col in sort_cols)
+            result = pd.read_sql_query(
+                text(
+                    f"SELECT {select_cols} FROM {table_name}{where_str} ORDER BY {order_str} LIMIT {int(page_size)}"
+                ),
+                con=self.engine,
+                params=params,
+            )
+            return self.decode_dates(self.decode_money(result))
+        except Exception as e:
+            print(e)
+            return None
+
+    def running_total_page_query(
+        self,
+        table_name: str,
+        sort_cols: List[str],
+        page_size: int,
+        running_totals: Dict[str, str],
+        partition_cols: List[str],
+        partition_condition: Optional[str] = None,
+        cursor: Optional[tuple] = None,
+        condition: Optional[str] = None,
+        descending: bool = False,
+        columns: Optional[List[str]] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Query one page of a table or view in the database, with running totals calculated by window functions.
+        Running totals are summed in `sort_cols` order over all rows matching `partition_condition`, before `condition`
+        and pagination are applied, so every returned row has its correct running total while only one page is read.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table or view in the database.
+
+        sort_cols: List[str]
+            Columns to sort by, the last column must be unique so that every row has a distinct key.
+
+        page_size: int
+            Maximum number of rows to return.
+
+        running_totals: Dict[str, str]
+            Dictionary with running total column names and SQL expressions to sum.
+
+        partition_cols: List[str]
+            Columns with separate running totals, e.g. account id.
+
+        partition_condition: Optional[str], default=None
+            Optional SQL condition to filter rows included in running totals.
+
+        cursor: Optional[tuple], default=None
+            Values of `sort_cols` for the last row of the previous page, first page if `None`.
+
+        condition: Optional[str], default=None
+            Optional SQL condition to filter returned rows with.
+
+        descending: bool, default=False
+            Sort returned rows in descending order. Running totals are always summed in ascending order.
+
+        columns: Optional[List[str]], default=None
+            Columns to return, all columns and running totals if `None`.
+
+        Returns
+        -------
+        `pd.DataFrame` with page rows, `None` if any errors.
+        """
+        window_cols = ", ".join(
+            f"SUM({expression}) OVER running_window AS {name}"
+            for name, expression in running_totals.items()
+        )
+        where_str = f" WHERE {partition_condition}" if partition_condition else ""
+        window_query = f"""(SELECT *, {window_cols} FROM {table_name}{where_str}
+        WINDOW running_window AS (PARTITION BY {', '.join(partition_cols)} ORDER BY {', '.join(sort_cols)}
+        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW))"""
+        return self.table_page_query(
+            window_query,
+            sort_cols=sort_cols,
+            page_size=page_size,
+            cursor=cursor,
+            condition=condition,
+            descending=descending,
+            columns=columns,
+        )
+
     def table_exists(self, table_name: str) -> bool:
         """
         Check if table exists in the database.
@@ -145,6 +826,31 @@ class ConnectDB:
             print(e)
             return False
 
+    def table_columns(self, table_name: str) -> Optional[List[str]]:
+        """
+        Get column names of a table or view in the database. Results are cached, as views are recreated with the same columns.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table or view in the database.
+
+        Returns
+        -------
+        `List[str]` with column names, `None` if any errors.
+        """
+        if table_name in self.table_columns_cache:
+            return self.table_columns_cache[table_name]
+        try:
+            result = self.table_query(f"PRAGMA table_info({table_name})")
+            columns = result["name"].to_list()
+            if len(columns) > 0:
+                self.table_columns_cache[table_name] = columns
+            return columns
+        except Exception as e:
+            print(e)
+            return None
+
     def table_insert(
         self, table_name: str, df: pd.DataFrame, if_exists: str = "append"
     ) -> bool:
@@ -167,7 +873,7 @@ class ConnectDB:
         `True` if insert is successful, `False` if errors.
         """
         try:
-            df.to_sql(
+            self.encode_dates(self.encode_money(df)).to_sql(
                 name=table_name, if_exists=if_exists, con=self.engine, index=False
             )
             return True
@@ -226,6 +932,7 @@ class ConnectDB:
         `True` if deletion is successful, `False` if errors.
         """
         try:
+            df = self.encode_dates(self.encode_money(df))
             update_str = ""
             for col in df:
                 if re.search(
@@ -283,12 +990,55 @@ class ConnectDB:
         else:
             return None
 
+    def table_trigger_queries(
+        self,
+        table_name: str,
+        log_table: str = "event_logs",
+        epoch_dates: Optional[bool] = None,
+    ) -> List[str]:
+        """
+        Get queries to drop and create INSERT, UPDATE and DELETE table triggers.
+        Uses `self.db_config_dict` config to get trigger definition for specified table_name.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table to create the trigger on in the database.
+
+        log_table: str, default="event_logs"
+            Name of event log table in the database to store results of trigger operations.
+
+        epoch_dates: Optional[bool], default=None
+            Log event timestamps as epoch seconds instead of the column default, current date storage if `None`.
+
+        Returns
+        -------
+        `List[str]` with DROP and CREATE TRIGGER queries.
+        """
+        id_field = self.db_config_dict["triggers"][table_name]["id_field"]
+        epoch_dates = self.epoch_dates if epoch_dates is None else epoch_dates
+        timestamp_col = ", event_timestamp" if epoch_dates else ""
+        timestamp_val = (
+            ", CAST(strftime('%s', 'now') AS INTEGER)" if epoch_dates else ""
+        )
+        queries = []
+        for event in ["INSERT", "UPDATE", "DELETE"]:
+            id_reference = "old" if event == "DELETE" else "new"
+            queries += [
+                f"DROP TRIGGER IF EXISTS {event.lower()}_event_{table_name}",
+                f"""CREATE TRIGGER {event.lower()}_event_{table_name}
+                AFTER {event} ON {table_name}
+                BEGIN
+                INSERT INTO {log_table} (event_table, event_foreign_key, event_type{timestamp_col}) VALUES ('{table_name}', {id_reference}.{id_field}, '{event}'{timestamp_val});
+                END;""",
+            ]
+        return queries
+
     def create_table_trigger(
         self, table_name: str, log_table: str = "event_logs"
     ) -> bool:
         """
-        Create INSERT, UPDATE and DELETE table triggers in the database.
-        Uses `self.db_config_dict` config to get trigger definition for specified table_name.
+        Create INSERT, UPDATE and DELETE table triggers in the database, see `table_trigger_queries()`.
 
         Parameters
         ----------
@@ -303,32 +1053,117 @@ class ConnectDB:
         `True` if triggers are created successfully, `False` otherwise.
         """
         try:
-            id_field = self.db_config_dict["triggers"][table_name]["id_field"]
-            for event in ["INSERT", "UPDATE", "DELETE"]:
-                id_reference = "old" if event == "DELETE" else "new"
-                trigger_delete_string = (
-                    f"DROP TRIGGER {event.lower()}_event_{table_name}"
-                )
-                trigger_create_string = f"""CREATE TRIGGER {event.lower()}_event_{table_name}
-                AFTER {event} ON {table_name}
-                BEGIN
-                INSERT INTO {log_table} (event_table, event_foreign_key, event_type) VALUES ('{table_name}', {id_reference}.{id_field}, '{event}');
-                END;"""
-                try:
-                    check = self.table_query(
-                        f"select * from sqlite_master where name='{event.lower()}_event_{table_name}' and type='trigger'"
-                    )
-                    if len(check) > 0:
-                        self.raw_query(trigger_delete_string)
-                    self.raw_query(trigger_create_string)
-                except Exception as e:
-                    print(e)
+            for query in self.table_trigger_queries(table_name, log_table):
+                if not self.raw_query(query):
                     return False
             return True
         except Exception as e:
             print(e)
             return False
 
+    def changed_keys(
+        self, since_event_id: int, tables: Optional[List[str]] = None
+    ) -> Optional[dict]:
+        """
+        Get keys of rows changed after an event, from the `event_logs` change feed.
+        Events of each key are collapsed to one row, and are read through the `(event_table, event_id)` index,
+        so consumers can poll with the `last_event_id` returned by the previous call.
+
+        Parameters
+        ----------
+        since_event_id: int
+            Last event id already seen by the consumer, `0` for all events.
+
+        tables: Optional[List[str]], default=None
+            Tables to get changed keys of, all tables if `None`.
+
+        Returns
+        -------
+        `dict` with `last_event_id` to poll from next, `changes` DataFrame with `event_table`, `event_foreign_key`,
+        `first_event_type`, `last_event_type` and `last_event_id` of each changed key, and `complete`, which is `False`
+        if events after `since_event_id` were removed by the retention policy and the consumer must reload all rows.
+        `None` if any errors.
+        """
+        table_condition = ""
+        if tables is not None:
+            table_list = ", ".join(f"'{table}'" for table in tables)
+            table_condition = f"event_table IN ({table_list}) AND "
+        results = self.multi_table_query(
+            {
+                "last_event": "SELECT IFNULL(MAX(event_id), 0) AS last_event_id FROM event_logs",
+                "changes": f"""SELECT event_table, event_foreign_key, first_event_type, last_event_type, last_event_id
+                FROM (SELECT event_table, event_foreign_key, FIRST_VALUE(event_type) OVER key_events AS first_event_type,
+                LAST_VALUE(event_type) OVER key_events AS last_event_type, MAX(event_id) OVER key_events AS last_event_id,
+                ROW_NUMBER() OVER (PARTITION BY event_table, event_foreign_key ORDER BY event_id DESC) AS key_row
+                FROM event_logs WHERE {table_condition}event_id > {int(since_event_id)}
+                WINDOW key_events AS (PARTITION BY event_table, event_foreign_key ORDER BY event_id
+                ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING))
+                WHERE key_row = 1 ORDER BY last_event_id""",
+            }
+        )
+        if any(df is None for df in results.values()):
+            return None
+        # Read after the changes, so events removed in between are reported as incomplete.
+        removed_through = int(
+            self.get_db_settings().get("event_logs_removed_through", 0)
+        )
+        return {
+            "last_event_id": int(results["last_event"]["last_event_id"][0]),
+            "changes": results["changes"],
+            "complete": int(since_event_id) >= removed_through,
+        }
+
+    def maintain_event_logs(
+        self,
+        retention_days: Optional[int] = None,
+        compact_after_days: Optional[int] = None,
+    ) -> bool:
+        """
+        Apply the retention policy and compact `event_logs`, in a single transaction.
+        Events older than `retention_days` are removed, and the last removed event id is saved in `db_settings`,
+        see `changed_keys()`. Events older than `compact_after_days` are removed when a later event of the same
+        key exists, so every changed key is still returned by the change feed, only with fewer event types.
+
+        Parameters
+        ----------
+        retention_days: Optional[int], default=None
+            Days to keep events for, from the `event_logs` section of the toml config if `None` (default 365).
+
+        compact_after_days: Optional[int], default=None
+            Days to keep superseded events for, from the `event_logs` section of the toml config if `None` (default 30).
+
+        Returns
+        -------
+        `True` if maintained successfully, `False` otherwise.
+        """
+        if retention_days is None:
+            retention_days = self.event_log_config.get("retention_days", 365)
+        if compact_after_days is None:
+            compact_after_days = self.event_log_config.get("compact_after_days", 30)
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        retention_cutoff = self.date_literal(
+            now - pd.Timedelta(days=retention_days), "event_timestamp"
+        )
+        compact_cutoff = self.date_literal(
+            now - pd.Timedelta(days=compact_after_days), "event_timestamp"
+        )
+        if not self.table_create("db_settings"):
+            return False
+        queries = [
+            # Events are removed up to an event id, so retained events are always all events after it.
+            f"""INSERT INTO db_settings (setting_name, setting_value)
+            SELECT 'event_logs_removed_through', removed_through FROM
+            (SELECT MAX(event_id) AS removed_through FROM event_logs WHERE event_timestamp < {retention_cutoff})
+            WHERE removed_through IS NOT NULL
+            ON CONFLICT(setting_name) DO UPDATE SET
+            setting_value = MAX(CAST(setting_value AS INTEGER), CAST(excluded.setting_value AS INTEGER))""",
+            """DELETE FROM event_logs WHERE event_id <= IFNULL((SELECT CAST(setting_value AS INTEGER) FROM db_settings
+            WHERE setting_name = 'event_logs_removed_through'), 0)""",
+            f"""DELETE FROM event_logs WHERE event_timestamp < {compact_cutoff}
+            AND event_id NOT IN (SELECT MAX(event_id) FROM event_logs GROUP BY event_table, event_foreign_key)""",
+        ]
+        return self.multi_raw_query(queries) is not None
+
     def create_table_view(self, view_name: str) -> bool:
         """
         Create a table view in the database, delete if it already exists in the database.
@@ -350,3 +1185,74 @@ class ConnectDB:
         except Exception as e:
             print(e)
             return False
+
+    def create_table_index(self, index_name: str) -> bool:
+        """
+        Create an index in the database if it doesn't exist.
+        Uses `self.db_config_dict` config to get index definition for specified index_name.
+
+        Parameters
+        ----------
+        index_name: str
+            Name of index to create in database.
+
+        Returns
+        -------
+        `True` if index is created successfully, `False` otherwise.
+        """
+        try:
+            result = self.raw_query(self.db_config_dict["indexes"][index_name])
+            return result
+        except Exception as e:
+            print(e)
+            return False
+
+    def create_index_trigger(self, trigger_name: str) -> bool:
+        """
+        Create a trigger maintaining a derived table in the database, replacing any existing trigger in the same
+        transaction, so changed definitions apply to existing databases.
+        Uses `self.db_config_dict` config to get trigger definition for specified trigger_name.
+
+        Parameters
+        ----------
+        trigger_name: str
+            Name of trigger to create in database.
+
+        Returns
+        -------
+        `True` if trigger is created successfully, `False` otherwise.
+        """
+        try:
+            return (
+                self.multi_raw_query(
+                    [
+                        f"DROP TRIGGER IF EXISTS {trigger_name}",
+                        self.db_config_dict["index_triggers"][trigger_name],
+                    ]
+                )
+                is not None
+            )
+        except Exception as e:
+            print(e)
+            return False
+
+    def backfill_table(self, table_name: str) -> bool:
+        """
+        Populate a derived table from existing rows in the database, after it is created.
+        Uses `self.db_config_dict` config to get backfill query for specified table_name.
+
+        Parameters
+        ----------
+        table_name: str
+            Name of table to populate in database.
+
+        Returns
+        -------
+        `True` if table is populated successfully, `False` otherwise.
+        """
+        try:
+            result = self.raw_query(self.db_config_dict["backfills"][table_name])
+            return result
+        except Exception as e:
+            print(e)
+            return False
@@ -2,17 +2,218 @@ import requests
 import numpy as np
 import pandas as pd
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from core_components.database import ConnectDB
+from core_components.session_cache import SessionCache, ResultCache
+from core_components.balance_history import BalanceHistory
+from core_components.archive import YearArchive
 import streamlit as st
 import math
-from babel.numbers import format_currency
+from babel import Locale
+from babel.numbers import LC_MONETARY, get_currency_precision
 from datetime import datetime, timedelta
 from typing import Unpack, TypedDict, Tuple, Any
 
 
 today = datetime.today()
 db_operations = ConnectDB("budget_db")
+session_cache = SessionCache()
+balance_history = BalanceHistory(db_operations)
+transaction_archive = YearArchive(db_operations)
+filter_cache = ResultCache("filter_results", max_entries=32)
+figure_cache = ResultCache("figures", max_entries=16)
+option_cache = ResultCache("option_lists", max_entries=64)
+spend_path_cache = ResultCache("spend_paths", max_entries=8)
+
+# Date columns parsed once while loading views, so pages don't need to re-parse them.
+# Epoch dates are already decoded to datetime by `ConnectDB.decode_dates()`, so parsing them is a no-op.
+frame_date_cols = {
+    "detailed_accounts": ["account_last_reconciled"],
+    "current_account_balances": ["account_last_reconciled"],
+    "detailed_transactions": ["transaction_date"],
+    "detailed_transfers": ["transfer_date"],
+}
+
+# Date column of frames loaded in time windows. Only the most recent months are loaded at first,
+# older rows are loaded when a filter requests a wider date range.
+frame_window_cols = {
+    "detailed_transactions": "transaction_date",
+    "detailed_transfers": "transfer_date",
+}
+initial_window_months = 3
+
+# Columns of each table or view used by a UI component, `None` loads all columns.
+# Pages combine the components they display with `required_columns()`.
+component_columns = {
+    "account_balances": {
+        "account_transaction_totals": None,
+        "detailed_accounts": None,
+    },
+    "account_dialog": {
+        "account_types": None,
+        "currencies": ["currency_abbr"],
+        "detailed_accounts": None,
+        "detailed_rewards_accounts": None,
+    },
+    "category_dialog": {"categories": None},
+    "transaction_dialog": {
+        "categories": None,
+        "detailed_accounts": None,
+        "detailed_rewards_accounts": None,
+        "transaction_sub_categories": None,
+    },
+    "transfer_dialog": {
+        "categories": None,
+        "currency_rates": None,
+        "detailed_accounts": None,
+    },
+    "transaction_filters": {
+        "categories": ["category_name"],
+        "detailed_accounts": None,
+    },
+    "filtered_transactions": {
+        "detailed_transactions": [
+            "transaction_account_type_name",
+            "transaction_account_name",
+            "transaction_category_name",
+            "transaction_date",
+            "transaction_status",
+            "transaction_merchant_name",
+            "transaction_amount",
+        ],
+    },
+    "transfer_filters": {"detailed_accounts": None},
+    "account_filters": {"detailed_accounts": None},
+    "category_cards": {"categories": None},
+    "spend_path": {
+        "detailed_transactions": [
+            "transaction_date",
+            "transaction_amount",
+            "transaction_merchant_name",
+            "transaction_account_name",
+            "transaction_account_type_name",
+            "transaction_category_name",
+            "transaction_currency",
+        ],
+    },
+    "current_balances": {
+        "currency_rates": None,
+        "detailed_transactions": [
+            "transaction_date",
+            "transaction_account_id",
+            "transaction_amount",
+        ],
+    },
+    "net_worth": {
+        "currency_rates": None,
+        "detailed_accounts": None,
+    },
+    "category_spend": {
+        "detailed_transactions": ["transaction_category_name", "transaction_amount"],
+    },
+    "base_currency": {"currencies": ["currency_abbr", "is_base_currency"]},
+}
+
+# Columns shown in the grid view of `display_card_ui()`, see `display_grid_ui()`.
+grid_columns = {
+    "transactions": {
+        "transaction_date": st.column_config.DateColumn("Date", format="MMM DD YYYY"),
+        "transaction_merchant_name": st.column_config.TextColumn("Merchant"),
+        "transaction_account_name": st.column_config.TextColumn("Account"),
+        "transaction_category_name": st.column_config.TextColumn("Category"),
+        "transaction_amount": st.column_config.NumberColumn("Amount", format="%.2f"),
+        "transaction_currency": st.column_config.TextColumn("Currency"),
+        "transaction_status": st.column_config.TextColumn("Status"),
+        "transaction_notes": st.column_config.TextColumn("Notes"),
+        "settled_running_balance": st.column_config.NumberColumn(
+            "Settled Balance", format="%.2f"
+        ),
+        "total_running_balance": st.column_config.NumberColumn(
+            "Total Balance", format="%.2f"
+        ),
+    },
+    "transfers": {
+        "transfer_date": st.column_config.DateColumn("Date", format="MMM DD YYYY"),
+        "origin_account_name": st.column_config.TextColumn("From"),
+        "destination_account_name": st.column_config.TextColumn("To"),
+        "origin_send_amount": st.column_config.NumberColumn(
+            "Sent Amount", format="%.2f"
+        ),
+        "origin_currency": st.column_config.TextColumn("Sent Currency"),
+        "destination_received_amount": st.column_config.NumberColumn(
+            "Received Amount", format="%.2f"
+        ),
+        "destination_currency": st.column_config.TextColumn("Received Currency"),
+        "transfer_status": st.column_config.TextColumn("Status"),
+    },
+    "accounts": {
+        "account_name": st.column_config.TextColumn("Account"),
+        "account_type_name": st.column_config.TextColumn("Account Type"),
+        "current_account_balance": st.column_config.NumberColumn(
+            "Current Balance", format="%.2f"
+        ),
+        "pending_account_balance": st.column_config.NumberColumn(
+            "Total Balance", format="%.2f"
+        ),
+        "account_currency": st.column_config.TextColumn("Currency"),
+        "account_last_reconciled": st.column_config.DateColumn(
+            "Last Reconciled", format="MMM DD YYYY"
+        ),
+    },
+}
+
+# Editable columns of each data editor UI, see `display_editor_ui()`. Columns not listed are not shown.
+editor_columns = {
+    "transactions": {
+        "transaction_date": st.column_config.DateColumn(
+            "Date", format="MMM DD YYYY", required=True
+        ),
+        "transaction_merchant_name": st.column_config.TextColumn(
+            "Merchant", required=True
+        ),
+        "transaction_account_name": st.column_config.TextColumn(
+            "Account", disabled=True
+        ),
+        "transaction_category_name": st.column_config.SelectboxColumn(
+            "Category", required=True
+        ),
+        "transaction_sub_category": st.column_config.TextColumn("Sub Category"),
+        "transaction_amount": st.column_config.NumberColumn(
+            "Amount", format="%.2f", required=True
+        ),
+        "transaction_currency": st.column_config.TextColumn("Currency", disabled=True),
+        "transaction_status": st.column_config.SelectboxColumn(
+            "Status", options=["Pending", "Complete"], required=True
+        ),
+        "transaction_notes": st.column_config.TextColumn("Notes"),
+    },
+}
+
+# Views paged through in the database by `display_card_ui()`, with the columns used as keyset cursor.
+# The last sort column must be unique so that every row has a distinct cursor.
+card_sources = {
+    "transactions": {
+        "view_name": "detailed_transactions",
+        "sort_cols": ["transaction_date", "transaction_id"],
+        "descending": True,
+        # Running totals of each account, spend is subtracted from the account starting balance.
+        "partition_col": "transaction_account_id",
+        "running_totals": {
+            "total_running_sum": "transaction_amount",
+            "settled_running_sum": "CASE WHEN transaction_status = 'Complete' THEN transaction_amount ELSE 0.0 END",
+        },
+    },
+    "transfers": {
+        "view_name": "detailed_transfers",
+        "sort_cols": ["transfer_date", "transfer_id"],
+        "descending": True,
+    },
+    "accounts": {
+        "view_name": "current_account_balances",
+        "sort_cols": ["account_name", "account_id"],
+        "descending": False,
+    },
+}
 
 
 class filterArgs(TypedDict, total=False):
@@ -235,9 +436,207 @@ class Currencies:
             return None
 
 
+class CurrencyFormatter:
+    def __init__(
+        self, currency: str, locale: Optional[str] = None, max_memo: int = 100000
+    ) -> None:
+        """
+        Initializes class with the parsed locale and currency pattern, so they aren't parsed again for each value.
+        Formatted values are memoized, as the same amounts are displayed on every rerun.
+
+        Parameters
+        ----------
+        currency: str
+            Currency abbreviation.
+
+        locale: Optional[str], default=None
+            Locale to format values with, Babel's default monetary locale if `None`.
+
+        max_memo: int, default=100000
+            Maximum number of memoized values, memo is cleared when exceeded.
+
+        Returns
+        ----------
+        `None`
+        """
+        self.currency = currency
+        self.locale = Locale.parse(locale or LC_MONETARY)
+        self.pattern = self.locale.currency_formats["standard"]
+        self.max_memo = max_memo
+        self.memo = {}
+
+    def format(self, number: float) -> str:
+        """
+        Format a value, same as `babel.numbers.format_currency()` with the standard currency format.
+
+        Parameters
+        ----------
+        number: float
+            Value to format.
+
+        Returns
+        -------
+        `str` with formatted value.
+        """
+        # Formatters are shared across sessions, read the memo once and return the local value,
+        # another thread may clear the memo in between.
+        formatted = self.memo.get(number)
+        if formatted is None:
+            formatted = self.pattern.apply(
+                number,
+                self.locale,
+                currency=self.currency,
+                currency_digits=True,
+                decimal_quantization=True,
+                group_separator=True,
+                numbering_system="latn",
+            )
+            # NaN never equals a memo key, memoizing it would only grow the memo.
+            if number != number:
+                return formatted
+            if len(self.memo) >= self.max_memo:
+                self.memo.clear()
+            self.memo[number] = formatted
+        return formatted
+
+    def format_array(self, values: np.ndarray | pd.Series) -> np.ndarray:
+        """
+        Format an array of values in one pass, each distinct value is only formatted once.
+
+        Parameters
+        ----------
+        values: np.ndarray | pd.Series
+            Values to format.
+
+        Returns
+        -------
+        `np.ndarray` of `str` with formatted values, in the same order as `values`.
+        """
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return np.array([], dtype=object)
+        unique_values, inverse = np.unique(values, return_inverse=True)
+        formatted = np.array(
+            [self.format(float(val)) for val in unique_values], dtype=object
+        )
+        return formatted[inverse.reshape(-1)]
+
+
+# Formatters are shared by all sessions, keyed by (currency, locale).
+currency_formatters = {}
+
+
+def get_currency_formatter(
+    currency: str, locale: Optional[str] = None
+) -> CurrencyFormatter:
+    """
+    Get cached `CurrencyFormatter` for a currency and locale, creating it if needed.
+
+    Parameters
+    ----------
+    currency: str
+        Currency abbreviation.
+
+    locale: Optional[str], default=None
+        Locale to format values with, Babel's default monetary locale if `None`.
+
+    Returns
+    -------
+    `CurrencyFormatter` for the currency and locale.
+    """
+    if (currency, locale) not in currency_formatters:
+        currency_formatters[(currency, locale)] = CurrencyFormatter(currency, locale)
+    return currency_formatters[(currency, locale)]
+
+
+def format_currency_values(
+    values: float | np.ndarray | pd.Series,
+    currency: str,
+    locale: Optional[str] = None,
+) -> str | np.ndarray:
+    """
+    Format a value or array of values as currency using cached formatters, see `CurrencyFormatter`.
+
+    Parameters
+    ----------
+    values: float | np.ndarray | pd.Series
+        Value or values to format.
+
+    currency: str
+        Currency abbreviation.
+
+    locale: Optional[str], default=None
+        Locale to format values with, Babel's default monetary locale if `None`.
+
+    Returns
+    -------
+    `str` with formatted value, or `np.ndarray` of `str` if `values` is an array.
+    """
+    formatter = get_currency_formatter(currency, locale)
+    if isinstance(values, (np.ndarray, pd.Series, list)):
+        return formatter.format_array(values)
+    return formatter.format(float(values))
+
+
+def canonical_filter_args(filter_args: filterArgs) -> tuple:
+    """
+    Convert filter values to a hashable form that doesn't depend on argument or selection order.
+
+    Parameters
+    ----------
+    filter_args: filterArgs
+        TypedDict with filter values.
+
+    Returns
+    -------
+    `tuple` with sorted `(filter, value)` pairs.
+    """
+    canonical_args = []
+    for key, val in sorted(filter_args.items()):
+        if isinstance(val, list):
+            val = tuple(sorted(map(str, val)))
+        elif isinstance(val, tuple):
+            val = tuple(pd.Timestamp(item).isoformat() for item in val)
+        canonical_args.append((key, val))
+    return tuple(canonical_args)
+
+
+def figure_cache_key(
+    figure_name: str, df_name: str, filter_args: filterArgs, *args: Any
+) -> tuple:
+    """
+    Get key for a figure in `figure_cache`, built from a DataFrame stored in st.session_state.
+
+    Parameters
+    ----------
+    figure_name: str
+        Name of figure.
+
+    df_name: str
+        Name of DataFrame in st.session_state the figure is built from.
+
+    filter_args: filterArgs
+        TypedDict with filters applied to the DataFrame.
+
+    *args: Any
+        Other hashable values the figure depends on, e.g. base currency.
+
+    Returns
+    -------
+    `tuple` with figure name, data version, canonical filters and other values.
+    """
+    return (
+        figure_name,
+        st.session_state[df_name].attrs.get("data_version"),
+        canonical_filter_args(filter_args),
+        *args,
+    )
+
+
 def filter_df(df_name: str, **kwargs: Unpack[filterArgs]) -> pd.DataFrame:
     """
     Perform filter operations on DataFrame stored in st.session_state.
+    Results are cached in `filter_cache` by DataFrame name, data version and filters, so repeated reruns skip filtering.
 
     Parameters
     ----------
@@ -252,6 +651,14 @@ def filter_df(df_name: str, **kwargs: Unpack[filterArgs]) -> pd.DataFrame:
     `pd.DataFrame` with filtered values.
     """
     df = st.session_state[df_name]
+    # Frames without a data version aren't tracked by `load_frames()`, and are always filtered.
+    cache_key = None
+    if "data_version" in df.attrs:
+        cache_key = (df_name, df.attrs["data_version"], canonical_filter_args(kwargs))
+        cached_df = filter_cache.get(cache_key)
+        if cached_df is not None:
+            # Shallow copy, so callers adding columns don't change the cached result.
+            return cached_df.copy(deep=False)
     # Defining the columns name for the specific DataFrame types.
     if df_name == "detailed_accounts_df" or df_name == "current_account_balances_df":
         cols = {
@@ -362,16 +769,135 @@ def filter_df(df_name: str, **kwargs: Unpack[filterArgs]) -> pd.DataFrame:
                 )
             ]
 
-    return df.reset_index(drop=True)
+    df = df.reset_index(drop=True)
+    if cache_key is not None:
+        filter_cache.put(cache_key, df)
+    return df.copy(deep=False)
+
+
+def sql_literal(val: Any) -> str:
+    """
+    Format a Python value as a SQL literal.
+
+    Parameters
+    ----------
+    val: Any
+        Value to format, strings are quoted and booleans are stored as integers.
+
+    Returns
+    -------
+    `str` with SQL literal.
+    """
+    if val is None:
+        return "NULL"
+    if isinstance(val, (bool, np.bool_)):
+        return str(int(val))
+    if isinstance(val, (int, float, np.integer, np.floating)):
+        return str(val)
+    return "'" + str(val).replace("'", "''") + "'"
+
+
+def filter_condition(view_name: str, **kwargs: Unpack[filterArgs]) -> str:
+    """
+    Build SQL condition equivalent to `filter_df()`, so filters can be applied in the database.
+
+    Parameters
+    ----------
+    view_name: str, ["detailed_accounts", "current_account_balances", "detailed_transactions", "detailed_transfers"]
+        View to filter.
+
+    **kwargs: Unpack[filterArgs]
+        TypedDict with filters to apply on the view.
+
+    Returns
+    -------
+    `str` with SQL condition, `"1=1"` if no filters apply.
+    """
+    conditions = []
+
+    def isin(col: str, values: List) -> None:
+        if len(values) > 0:
+            conditions.append(
+                f"{col} IN ({', '.join(sql_literal(val) for val in values)})"
+            )
+
+    def between(col: str, date_range: Tuple[datetime, datetime]) -> None:
+        # Dates are compared by day, the end date is included in the range.
+        start_date = pd.Timestamp(date_range[0]).normalize()
+        end_date = pd.Timestamp(date_range[1]).normalize() + pd.Timedelta(days=1)
+        conditions.append(
+            f"{col} >= {db_operations.date_literal(start_date, col)} AND {col} < {db_operations.date_literal(end_date, col)}"
+        )
+
+    if view_name in ["detailed_accounts", "current_account_balances"]:
+        isin("account_type_name", kwargs.get("account_types_filter", []))
+        isin("account_currency", kwargs.get("account_currency_filter", []))
+        isin("account_rewards", kwargs.get("account_rewards_filter", []))
+        if kwargs.get("is_active_filter"):
+            conditions.append("is_active = 1")
+    elif view_name == "detailed_transactions":
+        isin("transaction_account_type_name", kwargs.get("account_types_filter", []))
+        isin("transaction_account_name", kwargs.get("accounts_filter", []))
+        if "date_filter" in kwargs.keys():
+            between("transaction_date", kwargs["date_filter"])
+        isin("transaction_category_name", kwargs.get("categories_types_filter", []))
+        isin("transaction_status", kwargs.get("transaction_status_filter", []))
+        if "transfers_filter" in kwargs.keys() and not kwargs["transfers_filter"]:
+            conditions.append(
+                "instr(IFNULL(transaction_merchant_name, ''), 'Transfer') = 0"
+            )
+        if "inflow_filter" in kwargs.keys() and not kwargs["inflow_filter"]:
+            conditions.append("transaction_amount > 0")
+    elif view_name == "detailed_transfers":
+        isin("origin_account_name", kwargs.get("origin_account_filter", []))
+        isin("destination_account_name", kwargs.get("destination_account_filter", []))
+        if "date_filter" in kwargs.keys():
+            between("transfer_date", kwargs["date_filter"])
+
+    return " AND ".join(conditions) if conditions else "1=1"
+
+
+def filter_view(view_name: str, **kwargs: Unpack[filterArgs]) -> str:
+    """
+    Get the view to query with `filter_condition()`, skipping archived years when the date filter is within live years.
+    See `YearArchive.prune_view()`.
+
+    Parameters
+    ----------
+    view_name: str, ["detailed_accounts", "current_account_balances", "detailed_transactions", "detailed_transfers"]
+        View to filter.
+
+    **kwargs: Unpack[filterArgs]
+        TypedDict with filters to apply on the view.
+
+    Returns
+    -------
+    `str` with name of view to query.
+    """
+    if "date_filter" not in kwargs.keys():
+        return view_name
+    start_date, end_date = kwargs["date_filter"]
+    return transaction_archive.prune_view(
+        view_name,
+        [
+            [
+                pd.Timestamp(start_date).normalize(),
+                pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1),
+            ]
+        ],
+    )
 
 
 def cumulative_calculation(
     df: pd.DataFrame,
     sort_col: str = "transaction_date",
     cum_col: str = "transaction_amount",
+    group_col: Optional[str] = None,
+    zero_start: bool = True,
 ) -> pd.DataFrame:
     """
-    Perform a cumulative sum calculation on DataFrame and add a zero value at index 0.
+    Perform a cumulative sum calculation on DataFrame, for all rows or for each group, and add a zero value at the start.
+    Rows are sorted once and running totals of all groups are calculated in a single `groupby().cumsum()` pass.
 
     Parameters
     ----------
@@ -384,25 +910,174 @@ def cumulative_calculation(
     cum_col: str, default="transaction_amount"
         Column name to return after performing cumulative sum operation.
 
+    group_col: Optional[str], default=None
+        Column name to calculate separate running totals for, e.g. account or category. Single total if `None`.
+
+    zero_start: bool, default=True
+        Add a zero value row at the first `sort_col` value of each group, to start the running total at 0.
+
     Returns
     -------
     `pd.DataFrame` with added cumulative sum column and zero value.
     """
-    cumulative_calc = df.sort_values(sort_col)[cum_col].cumsum()
+    cumulative_col = f"{cum_col}_cumulative"
+    df = df.sort_values(sort_col, kind="stable")
+    if group_col:
+        df[cumulative_col] = df.groupby(group_col, observed=True, sort=False)[
+            cum_col
+        ].cumsum()
+    else:
+        df[cumulative_col] = df[cum_col].cumsum()
+
+    if zero_start:
+        # Adding a zero value to start the spend path viz at 0.
+        if group_col:
+            zero_val_df = df.groupby(
+                group_col, observed=True, sort=False, as_index=False
+            )[sort_col].min()
+        else:
+            zero_val_df = pd.DataFrame({sort_col: [df[sort_col].min()]})
+        zero_val_df[cum_col] = 0
+        zero_val_df[cumulative_col] = 0
+        if "transaction_merchant_name" in df.columns:
+            zero_val_df["transaction_merchant_name"] = ""
+        df = pd.concat([zero_val_df, df])
+
+    return df.reset_index(drop=True)
+
+
+def append_cumulative(
+    cumulative_df: pd.DataFrame,
+    new_df: pd.DataFrame,
+    sort_col: str = "transaction_date",
+    cum_col: str = "transaction_amount",
+    group_col: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Add rows to the output of `cumulative_calculation()` without recalculating existing running totals.
+    New running totals continue from the last total of each group. If any new row sorts before the last existing row,
+    running totals are recalculated for all rows instead.
+
+    Parameters
+    ----------
+    cumulative_df: pd.DataFrame
+        DataFrame with cumulative sum column, as returned by `cumulative_calculation()`.
+
+    new_df: pd.DataFrame
+        DataFrame with rows to add.
+
+    sort_col: str, default="transaction_date"
+        Column name to sort values by.
+
+    cum_col: str, default="transaction_amount"
+        Column name to perform cumulative sum operation on.
+
+    group_col: Optional[str], default=None
+        Column name with separate running totals. Single total if `None`.
+
+    Returns
+    -------
+    `pd.DataFrame` with existing and new rows, and cumulative sum column.
+    """
+    cumulative_col = f"{cum_col}_cumulative"
+    if len(new_df) == 0:
+        return cumulative_df
+    if (
+        len(cumulative_df) > 0
+        and new_df[sort_col].min() < cumulative_df[sort_col].max()
+    ):
+        return cumulative_calculation(
+            pd.concat([cumulative_df.drop(columns=cumulative_col), new_df]),
+            sort_col=sort_col,
+            cum_col=cum_col,
+            group_col=group_col,
+            zero_start=False,
+        )
+
+    new_df = new_df.sort_values(sort_col, kind="stable")
+    if group_col:
+        last_totals = cumulative_df.groupby(group_col, observed=True)[
+            cumulative_col
+        ].last()
+        new_df[cumulative_col] = new_df.groupby(group_col, observed=True, sort=False)[
+            cum_col
+        ].cumsum() + new_df[group_col].map(last_totals).astype(float).fillna(0.00)
+    else:
+        last_total = (
+            cumulative_df[cumulative_col].iloc[-1] if len(cumulative_df) > 0 else 0.00
+        )
+        new_df[cumulative_col] = new_df[cum_col].cumsum() + last_total
+    return pd.concat([cumulative_df, new_df], ignore_index=True)
+
 
-    df = df.join(cumulative_calc, rsuffix="_cumulative").sort_values(sort_col)
-    # Adding a zero value to start the spend path viz at 0.
-    zero_val_df = pd.DataFrame(
+def spend_path_frame(
+    filter_args: filterArgs, group_col: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Get running totals of filtered transactions for the spend path chart, see `cumulative_calculation()`.
+    Running totals are cached in `spend_path_cache`, and when only the end of the date filter moves later, running
+    totals up to the previous end date are kept and new rows are added with `append_cumulative()`. This includes
+    frames extended by `load_frame_windows()`, as extending a frame doesn't change rows already loaded.
+
+    Parameters
+    ----------
+    filter_args: filterArgs
+        Filters applied to transactions, must include `date_filter`.
+
+    group_col: Optional[str], default=None
+        Column name to calculate separate running totals for. Single total if `None`.
+
+    Returns
+    -------
+    `pd.DataFrame` with filtered transactions and `transaction_amount_cumulative` column.
+    """
+    df = st.session_state["detailed_transactions_df"]
+    start_date, end_date = filter_args["date_filter"]
+    other_args = {k: v for k, v in filter_args.items() if k != "date_filter"}
+    cache_key = (canonical_filter_args(other_args), group_col, start_date)
+    cached = spend_path_cache.get(cache_key)
+    if (
+        cached is not None
+        and cached["data_version"]
+        in (df.attrs.get("data_version"), df.attrs.get("extended_version"))
+        and cached["end_date"] <= end_date
+    ):
+        new_rows = filter_df(
+            df_name="detailed_transactions_df",
+            **other_args,
+            date_filter=(cached["end_date"], end_date),
+        )
+        new_rows = new_rows[
+            pd.to_datetime(new_rows["transaction_date"]) > cached["end_date"]
+        ]
+        # Groups without earlier rows need a zero value row, which is only added when calculating all rows.
+        if group_col is None or new_rows[group_col].isin(cached["df"][group_col]).all():
+            cumulative_df = append_cumulative(
+                cached["df"], new_rows, group_col=group_col
+            )
+            spend_path_cache.put(
+                cache_key,
+                {
+                    "data_version": df.attrs.get("data_version"),
+                    "end_date": end_date,
+                    "df": cumulative_df,
+                },
+            )
+            return cumulative_df.copy(deep=False)
+
+    cumulative_df = cumulative_calculation(
+        filter_df(df_name="detailed_transactions_df", **filter_args),
+        group_col=group_col,
+    )
+    spend_path_cache.put(
+        cache_key,
         {
-            "transaction_date": [df["transaction_date"].min()],
-            "transaction_amount": [0],
-            "transaction_amount_cumulative": [0],
-            "transaction_merchant_name": [""],
-        }
+            "data_version": df.attrs.get("data_version"),
+            "end_date": end_date,
+            "df": cumulative_df,
+        },
     )
-    df = pd.concat([zero_val_df, df])
-
-    return df.reset_index(drop=True)
+    return cumulative_df.copy(deep=False)
 
 
 def df_summary(
@@ -457,77 +1132,998 @@ def df_summary(
     return df
 
 
+def compact_df(
+    df: pd.DataFrame,
+    date_cols: Optional[List] = None,
+    category_threshold: float = 0.5,
+) -> pd.DataFrame:
+    """
+    Reduce the in-memory footprint of a DataFrame.
+    Repeated strings are dictionary-encoded as categoricals, integer id columns are downcast,
+    and the frame is rebuilt so that columns of the same dtype share a single array block.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to compact.
+
+    date_cols: Optional[List], default=None
+        List of columns to parse as datetime instead of keeping them as strings.
+
+    category_threshold: float, default=0.5
+        Maximum ratio of unique values to rows for a string column to be dictionary-encoded.
+
+    Returns
+    -------
+    `pd.DataFrame` with compacted columns. Input is returned unchanged if it is empty or not a DataFrame.
+    """
+    if not isinstance(df, pd.DataFrame) or len(df) == 0:
+        return df
+    date_cols = date_cols or []
+    compact_cols = {}
+    for col in df.columns:
+        series = df[col]
+        if col in date_cols:
+            series = pd.to_datetime(series)
+        elif series.dtype == object:
+            if series.nunique() <= category_threshold * len(series):
+                series = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series) and col.endswith("_id"):
+            series = pd.to_numeric(series, downcast="integer")
+        compact_cols[col] = series
+    # Building from a dict of columns consolidates same dtype columns into a single block.
+    return pd.DataFrame(compact_cols)
+
+
+def frame_memory_usage(df: pd.DataFrame) -> Tuple[int, float]:
+    """
+    Get memory used by a DataFrame, including the contents of string and categorical columns.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame to measure.
+
+    Returns
+    -------
+    `Tuple[int, float]` with total bytes and bytes per row.
+    """
+    total_bytes = int(df.memory_usage(index=True, deep=True).sum())
+    return total_bytes, (total_bytes / len(df) if len(df) > 0 else 0.0)
+
+
+def required_columns(*components: str) -> Dict[str, Optional[List]]:
+    """
+    Merge the columns declared in `component_columns` for a set of UI components.
+
+    Parameters
+    ----------
+    *components: str
+        Names of components in `component_columns` displayed on the page.
+
+    Returns
+    -------
+    `Dict[str, Optional[List]]` with table or view names and the superset of columns needed, `None` for all columns.
+    """
+    page_columns = {}
+    for component in components:
+        for table, columns in component_columns[component].items():
+            if columns is None or (
+                table in page_columns and page_columns[table] is None
+            ):
+                page_columns[table] = None
+            else:
+                existing = page_columns.get(table, [])
+                page_columns[table] = existing + [
+                    col for col in columns if col not in existing
+                ]
+    return page_columns
+
+
+def date_windows_condition(date_col: str, windows: List) -> str:
+    """
+    Get SQL condition selecting rows within a list of date windows.
+
+    Parameters
+    ----------
+    date_col: str
+        Name of date column.
+
+    windows: List
+        List of `[start, end]` ISO date strings, `start` is inclusive and `end` is exclusive. `None` end is unbounded.
+
+    Returns
+    -------
+    `str` with SQL condition, in the storage format of the date column, see `ConnectDB.date_literal()`.
+    """
+    conditions = []
+    for start, end in windows:
+        condition = f"{date_col} >= {db_operations.date_literal(start, date_col)}"
+        if end is not None:
+            condition += (
+                f" AND {date_col} < {db_operations.date_literal(end, date_col)}"
+            )
+        conditions.append(f"({condition})")
+    return " OR ".join(conditions)
+
+
+def missing_date_windows(
+    windows: List, start_date: datetime, end_date: datetime
+) -> List:
+    """
+    Get parts of a date range not covered by the date windows already loaded.
+
+    Parameters
+    ----------
+    windows: List
+        List of loaded `[start, end]` ISO date strings, sorted by start date. `None` end is unbounded.
+
+    start_date: datetime
+        Start of requested date range, inclusive.
+
+    end_date: datetime
+        End of requested date range, inclusive.
+
+    Returns
+    -------
+    `List` with missing `[start, end]` ISO date strings, `end` is exclusive.
+    """
+    cursor = pd.Timestamp(start_date).normalize()
+    end_date = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    missing = []
+    for window_start, window_end in windows:
+        window_start = pd.Timestamp(window_start)
+        window_end = pd.Timestamp(window_end) if window_end else pd.Timestamp.max
+        if window_end <= cursor:
+            continue
+        if window_start >= end_date:
+            break
+        if window_start > cursor:
+            missing.append((cursor, window_start))
+        cursor = max(cursor, window_end)
+    if cursor < end_date:
+        missing.append((cursor, end_date))
+    return [
+        [window_start.strftime("%Y-%m-%d"), window_end.strftime("%Y-%m-%d")]
+        for window_start, window_end in missing
+    ]
+
+
+def merge_date_windows(windows: List) -> List:
+    """
+    Merge overlapping or adjacent date windows.
+
+    Parameters
+    ----------
+    windows: List
+        List of `[start, end]` ISO date strings. `None` end is unbounded.
+
+    Returns
+    -------
+    `List` with merged `[start, end]` ISO date strings, sorted by start date.
+    """
+    merged = []
+    for start, end in sorted(windows, key=lambda window: window[0]):
+        if merged and (merged[-1][1] is None or start <= merged[-1][1]):
+            if merged[-1][1] is not None and (end is None or end > merged[-1][1]):
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def load_frames(page_columns: Dict[str, Optional[List]]) -> Dict[str, pd.DataFrame]:
+    """
+    Load tables and views needed by a page in compact form.
+    Frames already in st.session_state with the requested columns are skipped, frames spilled to disk by
+    `session_cache` are restored, and all remaining frames are queried in a single read transaction.
+    When a cached frame is missing requested columns, it is reloaded with the superset of both column lists.
+    Frames in `frame_window_cols` are only loaded for the last `initial_window_months`, see `load_frame_windows()`.
+
+    Parameters
+    ----------
+    page_columns: Dict[str, Optional[List]]
+        Dictionary with table or view names and columns to load, all columns if `None`. See `required_columns()`.
+
+    Returns
+    -------
+    `Dict[str, pd.DataFrame]` with loaded frames, to be stored in st.session_state by the page.
+    """
+    frames = {}
+    queries = {}
+    windows = {}
+    for table, columns in page_columns.items():
+        df = st.session_state.get(f"{table}_df")
+        restored = False
+        if not isinstance(df, pd.DataFrame):
+            df = session_cache.restore(f"{table}_df")
+            restored = True
+        if table in frame_window_cols:
+            windows[table] = [
+                [
+                    (
+                        datetime(today.year, today.month, 1)
+                        - pd.DateOffset(months=initial_window_months - 1)
+                    ).strftime("%Y-%m-%d"),
+                    None,
+                ]
+            ]
+        if isinstance(df, pd.DataFrame):
+            if set(columns or db_operations.table_columns(table) or []).issubset(
+                df.columns
+            ):
+                if restored:
+                    frames[table] = df
+                continue
+            if columns is not None:
+                # Frames are shared between pages, keep the columns already loaded.
+                columns = list(df.columns) + [
+                    col for col in columns if col not in df.columns
+                ]
+            # Reloaded frames keep the date windows already loaded.
+            windows[table] = df.attrs.get("date_windows")
+        select_cols = "*" if columns is None else ", ".join(columns)
+        queries[table] = f"Select {select_cols} from {table}"
+        if windows.get(table):
+            # Windows within live years are read without touching archived years.
+            queries[table] = (
+                f"Select {select_cols} from {transaction_archive.prune_view(table, windows[table])} "
+                f"where {date_windows_condition(frame_window_cols[table], windows[table])}"
+            )
+
+    results = db_operations.multi_table_query(
+        queries,
+        post_process=lambda table, df: compact_df(
+            df, date_cols=frame_date_cols.get(table)
+        ),
+    )
+    for table, df in results.items():
+        if isinstance(df, pd.DataFrame):
+            df.attrs["data_version"] = session_cache.next_data_version()
+            if windows.get(table):
+                df.attrs["date_windows"] = windows[table]
+        frames[table] = df
+    return frames
+
+
+def load_frame_windows(
+    date_ranges: Dict[str, Tuple[datetime, datetime]]
+) -> Dict[str, pd.DataFrame]:
+    """
+    Extend frames loaded in time windows to cover requested date ranges.
+    Only the date ranges not already loaded are queried from the database, in a single read transaction.
+
+    Parameters
+    ----------
+    date_ranges: Dict[str, Tuple[datetime, datetime]]
+        Dictionary with table or view names in st.session_state and date ranges needed, as in `filterArgs["date_filter"]`.
+
+    Returns
+    -------
+    `Dict[str, pd.DataFrame]` with extended frames, to be stored in st.session_state by the page.
+    """
+    queries = {}
+    windows = {}
+    for table, (start_date, end_date) in date_ranges.items():
+        df = st.session_state[f"{table}_df"]
+        if not df.attrs.get("date_windows"):
+            continue
+        missing = missing_date_windows(df.attrs["date_windows"], start_date, end_date)
+        if len(missing) == 0:
+            continue
+        windows[table] = merge_date_windows(df.attrs["date_windows"] + missing)
+        queries[table] = (
+            f"Select {', '.join(df.columns)} from {transaction_archive.prune_view(table, missing)} "
+            f"where {date_windows_condition(frame_window_cols[table], missing)}"
+        )
+
+    frames = {}
+    results = db_operations.multi_table_query(
+        queries,
+        post_process=lambda table, df: compact_df(
+            df, date_cols=frame_date_cols.get(table)
+        ),
+    )
+    for table, new_rows in results.items():
+        if not isinstance(new_rows, pd.DataFrame):
+            continue
+        df = st.session_state[f"{table}_df"]
+        if len(new_rows) > 0:
+            extended_version = df.attrs.get("data_version")
+            df = compact_df(
+                pd.concat([df, new_rows], ignore_index=True),
+                date_cols=frame_date_cols.get(table),
+            )
+            df.attrs["data_version"] = session_cache.next_data_version()
+            # Existing rows are unchanged, so results of the previous version stay valid within its windows.
+            df.attrs["extended_version"] = extended_version
+        else:
+            df = df.copy(deep=False)
+        df.attrs["date_windows"] = windows[table]
+        frames[table] = df
+    return frames
+
+
 def get_current_account_balances(
-    transactions_df: pd.DataFrame, accounts_df: pd.DataFrame
+    transaction_totals_df: pd.DataFrame, accounts_df: pd.DataFrame
 ) -> pd.DataFrame:
     """
-    Add column with current account balances to accounts DataFrame by summing all transactions for each account.
+    Add column with current account balances to accounts DataFrame using the transaction totals for each account.
+    Totals are summed in the database, so balances stay correct when transactions are only loaded for a time window.
 
     Parameters
     ----------
+    transaction_totals_df: pd.DataFrame
+        DataFrame with `all_transactions_sum` and `complete_transactions_sum` for each `transaction_account_id`.
+        (from the `account_transaction_totals` view)
+
+    accounts_df: pd.DataFrame
+        DataFrame with all accounts.
+
+    Returns
+    -------
+    `pd.DataFrame` with new column with current account balance..
+    """
+    if len(accounts_df) > 0:
+        balances_df = accounts_df.merge(
+            transaction_totals_df,
+            left_on="account_id",
+            right_on="transaction_account_id",
+            how="left",
+        )
+        balances_df["complete_transactions_sum"] = balances_df[
+            "complete_transactions_sum"
+        ].fillna(0.00)
+        balances_df["all_transactions_sum"] = balances_df[
+            "all_transactions_sum"
+        ].fillna(0.00)
+
+        balances_df["current_account_balance"] = (
+            balances_df["account_starting_balance"]
+            - balances_df["complete_transactions_sum"]
+        )
+        balances_df["pending_account_balance"] = (
+            balances_df["account_starting_balance"]
+            - balances_df["all_transactions_sum"]
+        )
+
+    else:
+        balances_df = accounts_df
+        balances_df[
+            [
+                "current_account_balance",
+                "pending_account_balance",
+                "complete_transactions_sum",
+                "all_transactions_sum",
+            ]
+        ] = None
+    return balances_df
+
+
+def add_reconciliation_checkpoint(account_id: int, checkpoint_date: Any) -> bool:
+    """
+    Save the current settled and total balance of an account as a reconciliation checkpoint.
+    Balances in the `account_transaction_totals` view start from the latest checkpoint of each account, and only sum
+    transactions added after it, see `get_reconciliation_checkpoint()`.
+
+    Parameters
+    ----------
+    account_id: int
+        Id of reconciled account.
+
+    checkpoint_date: Any
+        Date the account is reconciled as of.
+
+    Returns
+    -------
+    `True` if checkpoint saved successfully, `False` otherwise.
+    """
+    # Balances and last transaction id are read by a single statement, so they always match.
+    return db_operations.raw_query(
+        f"""INSERT INTO reconciliation_checkpoints (account_id, checkpoint_date, settled_balance, total_balance, last_transaction_id)
+        SELECT A.account_id, {db_operations.date_literal(checkpoint_date, "checkpoint_date")},
+        A.account_starting_balance - T.complete_transactions_sum,
+        A.account_starting_balance - T.all_transactions_sum,
+        (SELECT IFNULL(MAX(transaction_id), 0) FROM cashflow_transactions_all WHERE transaction_account_id = A.account_id)
+        FROM accounts A JOIN account_transaction_totals T ON T.transaction_account_id = A.account_id
+        WHERE A.account_id = {int(account_id)}"""
+    )
+
+
+def get_reconciliation_checkpoint(account_id: int) -> Optional[pd.Series]:
+    """
+    Get the latest reconciliation checkpoint of an account.
+    Checkpoints are removed by triggers when a transaction included in them is changed or deleted, or the account
+    starting balance is changed, so balances fall back to an earlier checkpoint or all transactions.
+
+    Parameters
+    ----------
+    account_id: int
+        Id of account.
+
+    Returns
+    -------
+    `pd.Series` with `checkpoint_date`, `settled_balance`, `total_balance` and `last_transaction_id`.
+    `None` if the account has no checkpoint or any errors.
+    """
+    checkpoint_df = db_operations.table_query(
+        f"""SELECT * FROM reconciliation_checkpoints WHERE account_id = {int(account_id)}
+        ORDER BY checkpoint_id DESC LIMIT 1"""
+    )
+    if checkpoint_df is None or len(checkpoint_df) == 0:
+        return None
+    checkpoint_df["checkpoint_date"] = pd.to_datetime(
+        checkpoint_df["checkpoint_date"], format="ISO8601"
+    )
+    return checkpoint_df.iloc[0]
+
+
+def match_statement(
+    statement_df: pd.DataFrame,
+    transactions_df: pd.DataFrame,
+    date_tolerance: int = 3,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Match bank statement lines with transactions of an account, each line and transaction is matched at most once.
+    Lines are first joined with transactions on exact date and amount. Remaining lines are matched with the transaction
+    with the same amount and the nearest date within `date_tolerance` days, using a sorted `pd.merge_asof()`.
+
+    Parameters
+    ----------
+    statement_df: pd.DataFrame
+        DataFrame with `statement_date`, `statement_amount` and `statement_description` columns.
+        Amounts are spend, using the same sign as `transaction_amount`.
+
     transactions_df: pd.DataFrame
-        DataFrame with all transactions.
+        DataFrame with `transaction_id`, `transaction_date`, `transaction_amount`, `transaction_status`
+        and `transaction_merchant_name` columns.
+
+    date_tolerance: int, default=3
+        Maximum number of days between statement line and transaction dates.
+
+    Returns
+    -------
+    `Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]` with matched lines and transactions, unmatched statement lines
+    and unmatched transactions.
+    """
+    # Amounts are compared in cents, so float rounding doesn't prevent exact matches.
+    statement_df = statement_df.assign(
+        statement_row=np.arange(len(statement_df)),
+        date_key=pd.to_datetime(statement_df["statement_date"]).dt.normalize(),
+        amount_key=np.round(statement_df["statement_amount"] * 100).astype(np.int64),
+    )
+    transactions_df = transactions_df.assign(
+        date_key=pd.to_datetime(transactions_df["transaction_date"]).dt.normalize(),
+        amount_key=np.round(transactions_df["transaction_amount"] * 100).astype(
+            np.int64
+        ),
+    )
+
+    # Repeated (date, amount) pairs are matched in order, the nth line with the nth transaction.
+    keys = ["date_key", "amount_key"]
+    exact_df = statement_df.assign(
+        occurrence=statement_df.groupby(keys).cumcount()
+    ).merge(
+        transactions_df.assign(occurrence=transactions_df.groupby(keys).cumcount())[
+            keys + ["occurrence", "transaction_id"]
+        ],
+        on=keys + ["occurrence"],
+    )
+    matches = [
+        exact_df.assign(match_type="Exact")[
+            ["statement_row", "transaction_id", "match_type"]
+        ]
+    ]
+
+    remaining_lines = statement_df[
+        ~statement_df["statement_row"].isin(exact_df["statement_row"])
+    ]
+    remaining_transactions = transactions_df[
+        ~transactions_df["transaction_id"].isin(exact_df["transaction_id"])
+    ]
+    remaining_transactions = remaining_transactions.sort_values("date_key")[
+        ["date_key", "amount_key", "transaction_id"]
+    ].rename(columns={"date_key": "transaction_date_key"})
+    remaining_lines = remaining_lines.sort_values("date_key")
+    # A transaction can be nearest to several lines, only the first is kept and the others are matched again.
+    while len(remaining_lines) > 0 and len(remaining_transactions) > 0:
+        nearest_df = pd.merge_asof(
+            remaining_lines[["statement_row", "date_key", "amount_key"]],
+            remaining_transactions,
+            left_on="date_key",
+            right_on="transaction_date_key",
+            by="amount_key",
+            tolerance=pd.Timedelta(days=date_tolerance),
+            direction="nearest",
+        ).dropna(subset=["transaction_id"])
+        nearest_df = nearest_df.drop_duplicates("transaction_id")
+        if len(nearest_df) == 0:
+            break
+        nearest_df["transaction_id"] = nearest_df["transaction_id"].astype(
+            transactions_df["transaction_id"].dtype
+        )
+        matches.append(
+            nearest_df.assign(match_type="Date tolerance")[
+                ["statement_row", "transaction_id", "match_type"]
+            ]
+        )
+        remaining_lines = remaining_lines[
+            ~remaining_lines["statement_row"].isin(nearest_df["statement_row"])
+        ]
+        remaining_transactions = remaining_transactions[
+            ~remaining_transactions["transaction_id"].isin(nearest_df["transaction_id"])
+        ]
+
+    matched_df = (
+        pd.concat(matches)
+        .merge(statement_df.drop(columns=keys), on="statement_row")
+        .merge(transactions_df.drop(columns=keys), on="transaction_id")
+        .sort_values("statement_row")
+        .reset_index(drop=True)
+    )
+    unmatched_statement_df = statement_df[
+        ~statement_df["statement_row"].isin(matched_df["statement_row"])
+    ].drop(columns=keys)
+    unmatched_transactions_df = transactions_df[
+        ~transactions_df["transaction_id"].isin(matched_df["transaction_id"])
+    ].drop(columns=keys)
+    return matched_df, unmatched_statement_df, unmatched_transactions_df
+
+
+def archived_transfer_ids(transfer_ids: List[int]) -> Set[int]:
+    """
+    Get ids of transfers with archived transactions, which are read-only, see `YearArchive.archived_ids()`.
+
+    Parameters
+    ----------
+    transfer_ids: List[int]
+        Ids of transfers to check.
+
+    Returns
+    -------
+    `Set[int]` with archived transfer ids, empty if no years are archived or any errors.
+    """
+    transfer_ids = [int(id) for id in transfer_ids if not pd.isnull(id)]
+    if len(transfer_ids) == 0 or len(transaction_archive.archived_years()) == 0:
+        return set()
+    transfer_transactions_df = db_operations.table_query(
+        f"""SELECT transaction_id, transfer_id FROM cashflow_transactions_all
+        WHERE transfer_id IN ({', '.join(str(id) for id in transfer_ids)})"""
+    )
+    if transfer_transactions_df is None:
+        return set()
+    archived = transaction_archive.archived_ids(
+        transfer_transactions_df["transaction_id"]
+    )
+    return set(
+        transfer_transactions_df.loc[
+            transfer_transactions_df["transaction_id"].isin(archived), "transfer_id"
+        ].astype(int)
+    )
+
+
+def bulk_update_status(
+    status: str,
+    transaction_ids: Optional[List[int]] = None,
+    transfer_ids: Optional[List[int]] = None,
+    account_id: Optional[int] = None,
+    end_date: Optional[Any] = None,
+) -> bool:
+    """
+    Change status of transactions and transfers with set-based UPDATEs in a single database transaction.
+    Transfers and their two transactions always keep the same status, selecting either updates both.
+    Cached transaction and transfer frames are patched in place instead of reloaded.
+
+    Parameters
+    ----------
+    status: str, ["Pending", "Complete"]
+        New status.
+
+    transaction_ids: Optional[List[int]], default=None
+        Ids of transactions to update.
+
+    transfer_ids: Optional[List[int]], default=None
+        Ids of transfers to update, transfers with archived transactions are skipped.
+
+    account_id: Optional[int], default=None
+        Update all transactions of the account, e.g. to complete all pending transactions of an account.
+
+    end_date: Optional[Any], default=None
+        Only update transactions of `account_id` dated on or before `end_date`.
+
+    Returns
+    -------
+    `True` if status updated successfully, `False` otherwise.
+    """
+    if transfer_ids:
+        # Transactions of archived transfers aren't in the live table, so only live transfers are updated.
+        archived = archived_transfer_ids(transfer_ids)
+        transfer_ids = [id for id in transfer_ids if int(id) not in archived]
+    conditions = []
+    if transaction_ids:
+        conditions.append(
+            f"transaction_id IN ({', '.join(str(int(id)) for id in transaction_ids)})"
+        )
+    if account_id is not None:
+        account_condition = f"transaction_account_id = {int(account_id)}"
+        if end_date is not None:
+            next_date = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+            account_condition += f" AND transaction_date < {db_operations.date_literal(next_date, 'transaction_date')}"
+        conditions.append(f"({account_condition})")
+    if len(conditions) == 0 and not transfer_ids:
+        return True
+    selected_transactions = " OR ".join(conditions) or "0"
+    selected_transfers = f"""transfer_id IN (SELECT transfer_id FROM cashflow_transactions
+    WHERE transfer_id IS NOT NULL AND ({selected_transactions}))"""
+    if transfer_ids:
+        selected_transfers += (
+            f" OR transfer_id IN ({', '.join(str(int(id)) for id in transfer_ids)})"
+        )
+    results = db_operations.multi_raw_query(
+        [
+            f"""UPDATE cashflow_transfers SET transfer_status = {sql_literal(status)}
+            WHERE transfer_status IS NOT {sql_literal(status)} AND ({selected_transfers})
+            RETURNING transfer_id""",
+            f"""UPDATE cashflow_transactions SET transaction_status = {sql_literal(status)}
+            WHERE transaction_status IS NOT {sql_literal(status)} AND ({selected_transactions} OR {selected_transfers})
+            RETURNING transaction_id""",
+        ]
+    )
+    if results is None:
+        return False
+
+    for df_name, id_col, status_col, updated_df in [
+        ("detailed_transfers_df", "transfer_id", "transfer_status", results[0]),
+        (
+            "detailed_transactions_df",
+            "transaction_id",
+            "transaction_status",
+            results[1],
+        ),
+    ]:
+        if len(updated_df) == 0:
+            continue
+        df = st.session_state.get(df_name)
+        # Frames loaded without the id or status column can't be patched, they are reloaded when needed.
+        if not isinstance(df, pd.DataFrame) or not {id_col, status_col}.issubset(
+            df.columns
+        ):
+            session_cache.invalidate(df_name)
+            continue
+        if (
+            isinstance(df[status_col].dtype, pd.CategoricalDtype)
+            and status not in df[status_col].cat.categories
+        ):
+            df[status_col] = df[status_col].cat.add_categories([status])
+        df.loc[df[id_col].isin(updated_df[id_col]), status_col] = status
+        df.attrs["data_version"] = session_cache.next_data_version()
+    session_cache.invalidate(
+        "account_transaction_totals_df", "current_account_balances_df"
+    )
+    return True
+
+
+def diff_frames(
+    original_df: pd.DataFrame, edited_df: pd.DataFrame, id_col: str, cols: List[str]
+) -> pd.DataFrame:
+    """
+    Get changed cells between two DataFrames with the same rows, compared one column at a time.
+
+    Parameters
+    ----------
+    original_df: pd.DataFrame
+        DataFrame with original values.
+
+    edited_df: pd.DataFrame
+        DataFrame with edited values, with the same index as `original_df`.
+
+    id_col: str
+        Column with row ids.
+
+    cols: List[str]
+        Columns to compare.
+
+    Returns
+    -------
+    `pd.DataFrame` with `id_col`, `column`, `original_value` and `value` for each changed cell.
+    """
+    changes = []
+    for col in cols:
+        original_values = original_df[col]
+        values = edited_df[col]
+        if pd.api.types.is_datetime64_any_dtype(original_values):
+            values = pd.to_datetime(values)
+        elif isinstance(original_values.dtype, pd.CategoricalDtype):
+            original_values = original_values.astype(object)
+        changed = ~(
+            (original_values == values) | (original_values.isna() & values.isna())
+        )
+        if changed.any():
+            changes.append(
+                pd.DataFrame(
+                    {
+                        id_col: original_df.loc[changed, id_col],
+                        "column": col,
+                        "original_value": original_values[changed],
+                        "value": values[changed],
+                    }
+                )
+            )
+    if len(changes) == 0:
+        return pd.DataFrame(columns=[id_col, "column", "original_value", "value"])
+    return pd.concat(changes, ignore_index=True)
+
+
+def save_transaction_edits(changes_df: pd.DataFrame) -> bool:
+    """
+    Save changed transaction cells in a single database transaction, see `diff_frames()`.
+    Each changed column is written by one parameterized UPDATE, executed as a batch for all rows changing it.
+    Changing an amount also recalculates rewards and total, as in `transaction_dialog()`.
+    Amounts and dates are written in their storage format, see `ConnectDB.encode_money()` and `ConnectDB.encode_dates()`.
+
+    Parameters
+    ----------
+    changes_df: pd.DataFrame
+        DataFrame with `transaction_id`, `column` and `value` for each changed cell.
+
+    Returns
+    -------
+    `True` if changes saved successfully, `False` otherwise.
+    """
+    if len(changes_df) == 0:
+        return True
+    categories = st.session_state["categories_df"].set_index("category_name")[
+        "category_id"
+    ]
+    # Rewards are rounded to whole minor units when amounts are stored as minor units.
+    rewards_digits = 2 if db_operations.money_scale is None else 0
+    set_clauses = {
+        "transaction_date": "transaction_date = :value",
+        "transaction_merchant_name": "transaction_merchant_name = :value",
+        "transaction_category_name": "transaction_category_id = :value",
+        "transaction_sub_category": "transaction_sub_category = :value",
+        "transaction_amount": f"transaction_amount = :value, rewards_amount = ROUND(:value * rewards_percentage / 100, {rewards_digits}), transaction_total = :value - ROUND(:value * rewards_percentage / 100, {rewards_digits})",
+        "transaction_status": "transaction_status = :value",
+        "transaction_notes": "transaction_notes = :value",
+    }
+    queries = []
+    params = []
+    for col, col_changes in changes_df.groupby("column", sort=False):
+        values = col_changes["value"]
+        if col == "transaction_date":
+            values = db_operations.encode_dates(
+                pd.DataFrame({col: pd.to_datetime(values).dt.strftime("%Y-%m-%d")})
+            )[col]
+        elif col == "transaction_category_name":
+            values = values.map(categories)
+        elif col == "transaction_amount":
+            values = db_operations.encode_money(
+                pd.DataFrame({col: values.astype(float)})
+            )[col]
+        queries.append(
+            f"UPDATE cashflow_transactions SET {set_clauses[col]} WHERE transaction_id = :id"
+        )
+        params.append(
+            [
+                {"id": int(id), "value": (None if pd.isnull(value) else value)}
+                for id, value in zip(col_changes["transaction_id"], values)
+            ]
+        )
+    return db_operations.multi_raw_query(queries, params) is not None
+
+
+def set_money_storage(minor_units: bool) -> bool:
+    """
+    Migrate money columns between decimal and integer minor unit storage, see `ConnectDB.set_money_storage()`.
+    A single scale is used for all money columns, from the largest number of decimals of account currencies,
+    so amounts in different currencies can still be summed and converted in the database.
+
+    Parameters
+    ----------
+    minor_units: bool
+        `True` to store integer minor units, `False` to store decimals.
+
+    Returns
+    -------
+    `True` if migrated successfully, `False` otherwise.
+    """
+    decimals = None
+    if minor_units:
+        currencies_df = db_operations.table_query(
+            "SELECT DISTINCT account_currency FROM accounts"
+        )
+        if currencies_df is None:
+            return False
+        decimals = max(
+            [2]
+            + [
+                get_currency_precision(currency)
+                for currency in currencies_df["account_currency"].dropna()
+            ]
+        )
+    return db_operations.set_money_storage(decimals)
+
+
+def account_conversion_rates(
+    accounts_df: pd.DataFrame,
+    base_currency: str,
+    currency_rates_df: Optional[pd.DataFrame] = None,
+) -> pd.Series:
+    """
+    Get conversion rates of each account to the base currency, see `Currencies.get_currency_conversion_rate()`.
+    Accounts in a currency without a rate get `NaN`, and are left out of converted totals instead of assuming a rate.
+
+    Parameters
+    ----------
+    accounts_df: pd.DataFrame
+        DataFrame with `account_id` and `account_currency` of accounts.
+
+    base_currency: str
+        Currency abbreviation to convert to.
+
+    currency_rates_df: Optional[pd.DataFrame], default=None
+        Optional DataFrame to use for currency rate calculations, queries the database otherwise.
+
+    Returns
+    -------
+    `pd.Series` with conversion rates indexed by `account_id`, `NaN` for accounts without a rate.
+    """
+    rates = {
+        currency: curr.get_currency_conversion_rate(
+            currency, base_currency, currency_rates_df
+        )
+        for currency in accounts_df["account_currency"].unique()
+    }
+    return pd.Series(
+        accounts_df["account_currency"].map(rates).astype(float).to_numpy(),
+        index=accounts_df["account_id"].to_numpy(),
+    )
+
+
+def account_balances_summary(
+    balances_df: pd.DataFrame,
+    period_transactions_df: pd.DataFrame,
+    group_by_type: bool = False,
+    base_currency: Optional[str] = None,
+    currency_rates_df: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Summarize current balances and their change over a period, with display values precomputed as columns.
+    Balances can be summed by account type, after conversion to `base_currency`. Accounts without a conversion rate
+    are left out of the sums, and their names are listed in `attrs["unconverted_accounts"]`.
+
+    Parameters
+    ----------
+    balances_df: pd.DataFrame
+        DataFrame with current balance of each account, see `get_current_account_balances()`.
+
+    period_transactions_df: pd.DataFrame
+        DataFrame with transactions within the period, used to calculate the change in balance.
+
+    group_by_type: bool, default=False
+        Sum balances by account type instead of showing each account.
+
+    base_currency: Optional[str], default=None
+        Currency to convert balances to when `group_by_type` is `True`.
+
+    currency_rates_df: Optional[pd.DataFrame], default=None
+        Optional DataFrame to use for currency rate calculations, see `Currencies.get_currency_conversion_rate()`.
+
+    Returns
+    -------
+    `pd.DataFrame` with `metric_label`, `balance_display`, `delta_display` and `delta_color` columns, sorted for display.
+    """
+    summary_df = balances_df[
+        [
+            "account_id",
+            "account_name",
+            "account_type_name",
+            "account_currency",
+            "current_account_balance",
+        ]
+    ].copy()
+    if len(summary_df) == 0:
+        return summary_df.assign(
+            metric_label=None,
+            balance_display=None,
+            delta_display=None,
+            delta_color=None,
+        )
+    period_totals = period_transactions_df.groupby(
+        "transaction_account_id", observed=True
+    )["transaction_amount"].sum()
+    # Transactions are stored as spend, the change in balance is the negative total.
+    summary_df["balance_delta"] = 0.00 - summary_df["account_id"].map(
+        period_totals
+    ).fillna(0.00)
+
+    unconverted_accounts = []
+    if group_by_type:
+        conversion_rates = account_conversion_rates(
+            summary_df, base_currency, currency_rates_df
+        ).to_numpy()
+        unconverted = np.isnan(conversion_rates)
+        unconverted_accounts = summary_df.loc[unconverted, "account_name"].to_list()
+        summary_df = summary_df.loc[~unconverted].copy()
+        conversion_rates = conversion_rates[~unconverted]
+        summary_df["current_account_balance"] *= conversion_rates
+        summary_df["balance_delta"] *= conversion_rates
+        summary_df = summary_df.groupby(
+            "account_type_name", observed=True, as_index=False
+        ).agg(
+            current_account_balance=("current_account_balance", "sum"),
+            balance_delta=("balance_delta", "sum"),
+            account_count=("account_id", "count"),
+        )
+        summary_df["account_currency"] = base_currency
+        summary_df["metric_label"] = (
+            summary_df["account_type_name"].astype(str)
+            + " :gray-background[:blue["
+            + summary_df["account_count"].astype(str)
+            + " accounts]]"
+        )
+        summary_df = summary_df.sort_values("account_type_name")
+    else:
+        summary_df["metric_label"] = (
+            summary_df["account_name"].astype(str)
+            + " :gray-background[:blue["
+            + summary_df["account_type_name"].astype(str)
+            + "]]"
+        )
+        summary_df = summary_df.sort_values(["account_type_name", "account_name"])
+
+    summary_df = summary_df.reset_index(drop=True)
+    summary_df["balance_display"] = None
+    summary_df["delta_display"] = None
+    for currency, rows in summary_df.groupby(
+        "account_currency", observed=True
+    ).groups.items():
+        summary_df.loc[rows, "balance_display"] = format_currency_values(
+            summary_df.loc[rows, "current_account_balance"], currency, locale="en_US"
+        )
+        summary_df.loc[rows, "delta_display"] = format_currency_values(
+            summary_df.loc[rows, "balance_delta"], currency, locale="en_US"
+        )
+    summary_df["delta_color"] = np.where(
+        summary_df["balance_delta"] == 0, "off", "normal"
+    )
+    summary_df.attrs["unconverted_accounts"] = unconverted_accounts
+    return summary_df
+
+
+def account_balance_history(
+    accounts_df: pd.DataFrame,
+    base_currency: str,
+    currency_rates_df: Optional[pd.DataFrame] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Get daily balances of each account in the base currency, from the balance matrix cached by `balance_history`.
+    Accounts without a conversion rate are left out, and their names are listed in `attrs["unconverted_accounts"]`.
+
+    Parameters
+    ----------
+    accounts_df: pd.DataFrame
+        DataFrame with `account_id`, `account_name` and `account_currency` of accounts to include.
+
+    base_currency: str
+        Currency abbreviation to convert balances to.
 
-    accounts_df: pd.DataFrame
-        DataFrame with all accounts.
+    currency_rates_df: Optional[pd.DataFrame], default=None
+        Optional DataFrame to use for currency rate calculations, see `Currencies.get_currency_conversion_rate()`.
 
     Returns
     -------
-    `pd.DataFrame` with new column with current account balance..
+    `pd.DataFrame` with a row per day, indexed by date, and a column per account name. `None` if any errors.
     """
-    all_transactions_sum = df_summary(
-        transactions_df,
-        "transaction_account_id",
-        "transaction_amount",
-        "all_transactions_sum",
-    )
-    complete_transactions_sum = df_summary(
-        transactions_df[transactions_df["transaction_status"] == "Complete"],
-        "transaction_account_id",
-        "transaction_amount",
-        "complete_transactions_sum",
+    conversion_rates = account_conversion_rates(
+        accounts_df, base_currency, currency_rates_df
     )
-
-    if len(accounts_df) > 0:
-        balances_df = accounts_df.merge(
-            all_transactions_sum,
-            left_on="account_id",
-            right_on="transaction_account_id",
-            how="left",
-        )
-        balances_df = balances_df.merge(
-            complete_transactions_sum,
-            left_on="account_id",
-            right_on="transaction_account_id",
-            how="left",
-        )
-        balances_df["complete_transactions_sum"] = balances_df[
-            "complete_transactions_sum"
-        ].fillna(0.00)
-        balances_df["all_transactions_sum"] = balances_df[
-            "all_transactions_sum"
-        ].fillna(0.00)
-
-        balances_df["current_account_balance"] = (
-            balances_df["account_starting_balance"]
-            - balances_df["complete_transactions_sum"]
-        )
-        balances_df["pending_account_balance"] = (
-            balances_df["account_starting_balance"]
-            - balances_df["all_transactions_sum"]
-        )
-
-    else:
-        balances_df = accounts_df
-        balances_df[
-            [
-                "current_account_balance",
-                "pending_account_balance",
-                "complete_transactions_sum",
-                "all_transactions_sum",
-            ]
-        ] = None
-    return balances_df
+    history_df = balance_history.balances(accounts_df, conversion_rates)
+    if history_df is not None:
+        history_df.attrs["unconverted_accounts"] = accounts_df.loc[
+            conversion_rates.isna().to_numpy(), "account_name"
+        ].to_list()
+    return history_df
 
 
 def populate_list(series: pd.Series, values: str | List = ["<New value>"]) -> np.array:
@@ -551,14 +2147,88 @@ def populate_list(series: pd.Series, values: str | List = ["<New value>"]) -> np
     return pd.concat([pd.Series(values), series]).unique()
 
 
-def get_index(row: pd.Series, val: str | int) -> Optional[int]:
+class OptionList(list):
+    def __init__(self, values: List) -> None:
+        """
+        Initializes list of widget options with a map of each value to its position, used by `get_index()`.
+
+        Parameters
+        ----------
+        values: List
+            Sorted unique option values.
+
+        Returns
+        ----------
+        `None`
+        """
+        super().__init__(values)
+        self.positions = {val: i for i, val in enumerate(values)}
+
+
+def option_list(
+    df_name: str,
+    col: str,
+    new_value: bool = False,
+    active_only: bool = False,
+    exclude: Optional[str] = None,
+) -> OptionList:
+    """
+    Get sorted unique values of a column in a DataFrame stored in st.session_state, to be used as widget options.
+    Lists are cached in `option_cache` by DataFrame name and data version, so they are only computed once per load.
+
+    Parameters
+    ----------
+    df_name: str
+        Name of DataFrame in st.session_state.
+
+    col: str
+        Name of column to get values from.
+
+    new_value: bool, default=False
+        Add `"<New value>"` as first option, see `populate_list()`.
+
+    active_only: bool, default=False
+        Only use rows where `is_active` is `True`.
+
+    exclude: Optional[str], default=None
+        Drop values containing this string.
+
+    Returns
+    -------
+    `OptionList` with option values.
+    """
+    df = st.session_state[df_name]
+    cache_key = (
+        df_name,
+        df.attrs.get("data_version"),
+        col,
+        new_value,
+        active_only,
+        exclude,
+    )
+    if cache_key[1] is not None:
+        options = option_cache.get(cache_key)
+        if options is not None:
+            return options
+
+    series = df.loc[df["is_active"] == True, col] if active_only else df[col]
+    values = pd.Series(series.dropna().unique()).astype(str).sort_values()
+    if exclude is not None:
+        values = values[~values.str.contains(exclude, regex=False)]
+    options = OptionList(list(populate_list(values) if new_value else values.to_list()))
+    if cache_key[1] is not None:
+        option_cache.put(cache_key, options)
+    return options
+
+
+def get_index(row: pd.Series | OptionList, val: str | int) -> Optional[int]:
     """
     Get index for an element in a pd.Series.
 
     Parameters
     ----------
-    row: pd.Series
-        Input Series to lookup value.
+    row: pd.Series | OptionList
+        Input Series to lookup value. `OptionList` values are looked up in its position map instead of scanning.
 
     val: str| int
         Value to lookup in `row`.
@@ -567,6 +2237,11 @@ def get_index(row: pd.Series, val: str | int) -> Optional[int]:
     -------
     `int` with summarized values. `None` if not found or error.
     """
+    if isinstance(row, OptionList):
+        try:
+            return row.positions.get(val)
+        except TypeError:
+            return None
     try:
         ind = np.where(row == val)[0][0]
         return int(ind)
@@ -574,6 +2249,37 @@ def get_index(row: pd.Series, val: str | int) -> Optional[int]:
         return None
 
 
+def search_merchants(query: str, limit: int = 10) -> pd.DataFrame:
+    """
+    Search the merchant index for merchants starting with `query`, most used first.
+    Uses the `merchants` table maintained by triggers on cashflow_transactions, so cost doesn't depend on the
+    number of transactions loaded.
+
+    Parameters
+    ----------
+    query: str
+        Merchant name prefix, case insensitive. Empty string matches all merchants.
+
+    limit: int, default=10
+        Maximum number of merchants to return.
+
+    Returns
+    -------
+    `pd.DataFrame` with merchant name, usage count, and last used account, category and sub category.
+    Empty DataFrame if any errors.
+    """
+    prefix = (query or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    result = db_operations.table_query(
+        f"""SELECT M.merchant_name, M.usage_count, A.account_name as last_account_name,
+        C.category_name as last_category_name, M.last_sub_category FROM merchants M
+        LEFT JOIN accounts A ON M.last_account_id = A.account_id
+        LEFT JOIN categories C ON M.last_category_id = C.category_id
+        WHERE M.usage_count > 0 AND M.merchant_name LIKE {sql_literal(prefix + "%")} ESCAPE '\\'
+        ORDER BY M.usage_count DESC, M.merchant_name LIMIT {int(limit)}"""
+    )
+    return result if isinstance(result, pd.DataFrame) else pd.DataFrame()
+
+
 @st.dialog("Category Details")
 def category_dialog(row: Optional[dict] = None) -> None:
     """
@@ -606,12 +2312,14 @@ def category_dialog(row: Optional[dict] = None) -> None:
 
         block1 = st.columns(2)
         if row.get("category_id"):
+            # Checked in the database including archived years, as transactions may only be loaded for a time window.
+            category_transactions = db_operations.table_query(
+                f"Select count(*) as transaction_count from cashflow_transactions_all where transaction_category_id={row.get('category_id')}"
+            )
             delete_enabled = (
                 False
-                if row.get("category_id")
-                in st.session_state["detailed_transactions_df"][
-                    "transaction_category_id"
-                ].unique()
+                if category_transactions is None
+                or category_transactions["transaction_count"][0] > 0
                 else True
             )
             if block1[1].button(
@@ -626,10 +2334,7 @@ def category_dialog(row: Optional[dict] = None) -> None:
                     df=category,
                 )
                 # Need to rerun so that option values get updated.
-                del (
-                    st.session_state["categories_df"],
-                    st.session_state["detailed_transactions_df"],
-                )
+                session_cache.invalidate("categories_df", "detailed_transactions_df")
                 st.rerun()
             with block1[0].popover(
                 "Delete Category", use_container_width=True, disabled=not delete_enabled
@@ -645,14 +2350,14 @@ def category_dialog(row: Optional[dict] = None) -> None:
                         id_col="category_id",
                         val=row.get("category_id"),
                     )
-                    del st.session_state["categories_df"]
+                    session_cache.invalidate("categories_df")
                     st.rerun()
         else:
             if block1[1].button(
                 "Add Category", disabled=not submit_enabled, use_container_width=True
             ):
                 db_operations.table_insert(table_name="categories", df=category)
-                del st.session_state["categories_df"]
+                session_cache.invalidate("categories_df")
                 st.rerun()
 
 
@@ -678,9 +2383,7 @@ def account_dialog(row: Optional[dict] = None) -> None:
         )
 
         block1 = st.columns([8, 1], vertical_alignment="bottom")
-        account_type_options = st.session_state["account_types_df"][
-            "account_type_name"
-        ].sort_values()
+        account_type_options = option_list("account_types_df", "account_type_name")
         account_type = block1[0].selectbox(
             options=account_type_options,
             label="Type",
@@ -709,13 +2412,11 @@ def account_dialog(row: Optional[dict] = None) -> None:
                     table_name="account_types",
                     df=pd.DataFrame({"account_type_name": [new_account_type]}),
                 )
-                del st.session_state["account_types_df"]
+                session_cache.invalidate("account_types_df")
                 st.rerun()
 
         block2 = st.columns([4, 5])
-        account_currency_options = st.session_state["currencies_df"][
-            "currency_abbr"
-        ].sort_values()
+        account_currency_options = option_list("currencies_df", "currency_abbr")
         account_currency = block2[0].selectbox(
             options=account_currency_options,
             label="Select Account Currency",
@@ -810,9 +2511,9 @@ def account_dialog(row: Optional[dict] = None) -> None:
                         val=row.get("account_id"),
                         df=deactivate_df,
                     )
-                del (
-                    st.session_state["detailed_accounts_df"],
-                    st.session_state["detailed_rewards_accounts_df"],
+                session_cache.invalidate(
+                    "detailed_accounts_df",
+                    "detailed_rewards_accounts_df",
                 )
                 st.rerun()
             deactivate_enabled = row.get("is_active")
@@ -836,9 +2537,9 @@ def account_dialog(row: Optional[dict] = None) -> None:
                         val=row.get("account_id"),
                         df=deactivate_df,
                     )
-                    del (
-                        st.session_state["detailed_accounts_df"],
-                        st.session_state["detailed_rewards_accounts_df"],
+                    session_cache.invalidate(
+                        "detailed_accounts_df",
+                        "detailed_rewards_accounts_df",
                     )
                     st.rerun()
         else:
@@ -854,9 +2555,9 @@ def account_dialog(row: Optional[dict] = None) -> None:
                     db_operations.table_insert(
                         table_name="rewards_accounts", df=rewards_account
                     )
-                del (
-                    st.session_state["detailed_accounts_df"],
-                    st.session_state["detailed_rewards_accounts_df"],
+                session_cache.invalidate(
+                    "detailed_accounts_df",
+                    "detailed_rewards_accounts_df",
                 )
                 st.rerun()
 
@@ -880,36 +2581,47 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
 
     with st.container():
         block1 = st.columns([3, 3, 2])
-        merchant_options = st.session_state["detailed_transactions_df"][
-            ~st.session_state["detailed_transactions_df"][
-                "transaction_merchant_name"
-            ].str.contains("Transfer")
-        ]["transaction_merchant_name"]
-        final_merchant_options = populate_list(merchant_options.sort_values())
-        merchant = block1[0].selectbox(
+        merchant_query = block1[0].text_input(
+            "Search Merchant/Location",
+            value=row.get("transaction_merchant_name") or "",
+        )
+        merchant_matches = search_merchants(merchant_query)
+        merchant_options = OptionList(
+            merchant_matches["merchant_name"].to_list()
+            if len(merchant_matches) > 0
+            else []
+        )
+        # Typed value is offered as a new merchant when it isn't in the index.
+        if merchant_query and merchant_query.lower() not in [
+            merchant.lower() for merchant in merchant_options
+        ]:
+            merchant_options = OptionList(merchant_options + [merchant_query])
+        final_merchant = block1[0].selectbox(
             "Merchant/Location",
-            options=final_merchant_options,
+            options=merchant_options,
             index=(
-                get_index(final_merchant_options, row.get("transaction_merchant_name"))
-                or 0
+                get_index(merchant_options, row.get("transaction_merchant_name")) or 0
             ),
         )
-        # New values cannot be typed in selectbox, thus creating new field.
-        if merchant == "<New value>":
-            new_merchant = block1[0].text_input("Add new Merchant/Location")
-            final_merchant = new_merchant
-        else:
-            final_merchant = merchant
-        account_options = st.session_state["detailed_accounts_df"][
-            st.session_state["detailed_accounts_df"]["is_active"] == True
-        ]["account_name"].sort_values()
+        # New transactions are prefilled with the account and category last used with the merchant.
+        merchant_details = {}
+        if not row.get("transaction_id") and final_merchant in merchant_options:
+            position = merchant_options.positions[final_merchant]
+            if position < len(merchant_matches):
+                merchant_details = merchant_matches.iloc[position].to_dict()
+        account_options = option_list(
+            "detailed_accounts_df", "account_name", active_only=True
+        )
         account_name = block1[1].selectbox(
             "Account",
             options=account_options,
             index=(
                 get_index(
                     account_options,
-                    row.get("transaction_account_name"),
+                    row.get(
+                        "transaction_account_name",
+                        merchant_details.get("last_account_name"),
+                    ),
                 )
                 or 0
             ),
@@ -926,16 +2638,17 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
         )
 
         block2 = st.columns(3)
-        category_options = st.session_state["categories_df"][
-            "category_name"
-        ].sort_values()
+        category_options = option_list("categories_df", "category_name")
         category = block2[0].selectbox(
             "Category",
             options=category_options,
             index=(
                 get_index(
                     category_options,
-                    row.get("transaction_category_name"),
+                    row.get(
+                        "transaction_category_name",
+                        merchant_details.get("last_category_name"),
+                    ),
                 )
                 or 0
             ),
@@ -945,15 +2658,20 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
             .loc[st.session_state["categories_df"]["category_name"] == category]
             .iloc[0]
         )
-        sub_category_options = populate_list(
-            st.session_state["detailed_transactions_df"][
-                "transaction_sub_category"
-            ].sort_values()
+        # Read from all transactions, as transactions may only be loaded for a time window.
+        sub_category_options = option_list(
+            "transaction_sub_categories_df", "transaction_sub_category", new_value=True
         )
         sub_category = block2[1].selectbox(
             "Sub Category",
             options=sub_category_options,
-            index=get_index(sub_category_options, row.get("transaction_sub_category")),
+            index=get_index(
+                sub_category_options,
+                row.get(
+                    "transaction_sub_category",
+                    merchant_details.get("last_sub_category"),
+                ),
+            ),
         )
         # New values cannot be typed in selectbox, thus creating new field.
         if sub_category == "<New value>":
@@ -1039,10 +2757,16 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
                 }
             )
         block4 = st.columns(3)
+        archived = bool(
+            row.get("transaction_id")
+            and transaction_archive.archived_ids([row["transaction_id"]])
+        )
+        if archived:
+            block4[1].caption("Archived transaction, read-only.")
         if row.get("transaction_id"):
             if block4[2].button(
                 "Update Transaction",
-                disabled=not submit_enabled,
+                disabled=not submit_enabled or archived,
                 use_container_width=True,
             ):
                 db_operations.table_update(
@@ -1051,12 +2775,16 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
                     val=row.get("transaction_id"),
                     df=transaction,
                 )
-                del (
-                    st.session_state["detailed_transactions_df"],
-                    st.session_state["current_account_balances_df"],
+                session_cache.invalidate(
+                    "detailed_transactions_df",
+                    "transaction_sub_categories_df",
+                    "account_transaction_totals_df",
+                    "current_account_balances_df",
                 )
                 st.rerun()
-            with block4[0].popover("Delete Transaction", use_container_width=True):
+            with block4[0].popover(
+                "Delete Transaction", disabled=archived, use_container_width=True
+            ):
                 if st.button(
                     "Delete Transaction",
                     disabled=not submit_enabled,
@@ -1068,9 +2796,11 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
                         id_col="transaction_id",
                         val=row.get("transaction_id"),
                     )
-                    del (
-                        st.session_state["detailed_transactions_df"],
-                        st.session_state["current_account_balances_df"],
+                    session_cache.invalidate(
+                        "detailed_transactions_df",
+                        "transaction_sub_categories_df",
+                        "account_transaction_totals_df",
+                        "current_account_balances_df",
                     )
                     st.rerun()
         else:
@@ -1080,9 +2810,11 @@ def transaction_dialog(row: Optional[dict] = None) -> None:
                 db_operations.table_insert(
                     table_name="cashflow_transactions", df=transaction
                 )
-                del (
-                    st.session_state["detailed_transactions_df"],
-                    st.session_state["current_account_balances_df"],
+                session_cache.invalidate(
+                    "detailed_transactions_df",
+                    "transaction_sub_categories_df",
+                    "account_transaction_totals_df",
+                    "current_account_balances_df",
                 )
                 st.rerun()
 
@@ -1105,9 +2837,9 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
         row = dict()
     with st.container():
         block1 = st.columns(2)
-        origin_account_options = st.session_state["detailed_accounts_df"][
-            st.session_state["detailed_accounts_df"]["is_active"] == True
-        ]["account_name"].sort_values()
+        origin_account_options = option_list(
+            "detailed_accounts_df", "account_name", active_only=True
+        )
         origin_account = block1[0].selectbox(
             options=origin_account_options,
             label="Origin Account",
@@ -1127,10 +2859,15 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
             ]
             .iloc[0]
         )
-        destination_account_options = st.session_state["detailed_accounts_df"][
-            (st.session_state["detailed_accounts_df"]["account_name"] != origin_account)
-            & (st.session_state["detailed_accounts_df"]["is_active"] == True)
-        ]["account_name"].sort_values()
+        destination_account_options = OptionList(
+            [
+                account
+                for account in option_list(
+                    "detailed_accounts_df", "account_name", active_only=True
+                )
+                if account != origin_account
+            ]
+        )
         destination_account = block1[1].selectbox(
             options=destination_account_options,
             label="Destination Account",
@@ -1290,10 +3027,15 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
                 }
             )
         block6 = st.columns(3)
+        archived = bool(
+            row.get("transfer_id") and archived_transfer_ids([row["transfer_id"]])
+        )
+        if archived:
+            block6[1].caption("Archived transfer, read-only.")
         if row.get("transfer_id"):
             if block6[2].button(
                 "Update Transfer",
-                disabled=not submit_enabled,
+                disabled=not submit_enabled or archived,
                 use_container_width=True,
             ):
                 db_operations.table_update(
@@ -1314,12 +3056,15 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
                     val=[row.get("destination_account_id"), row.get("transfer_id")],
                     df=transactions.loc[1:1],
                 )
-                del (
-                    st.session_state["detailed_transactions_df"],
-                    st.session_state["detailed_transfers_df"],
+                session_cache.invalidate(
+                    "detailed_transactions_df",
+                    "detailed_transfers_df",
+                    "account_transaction_totals_df",
                 )
                 st.rerun()
-            with block6[0].popover("Delete Transfer", use_container_width=True):
+            with block6[0].popover(
+                "Delete Transfer", disabled=archived, use_container_width=True
+            ):
                 if st.button(
                     "Delete Transfer",
                     disabled=not submit_enabled,
@@ -1336,9 +3081,10 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
                         id_col="transfer_id",
                         val=row.get("transfer_id"),
                     )
-                    del (
-                        st.session_state["detailed_transactions_df"],
-                        st.session_state["detailed_transfers_df"],
+                    session_cache.invalidate(
+                        "detailed_transactions_df",
+                        "detailed_transfers_df",
+                        "account_transaction_totals_df",
                     )
                     st.rerun()
         else:
@@ -1353,9 +3099,10 @@ def transfer_dialog(row: Optional[dict] = None) -> None:
                 db_operations.table_insert(
                     table_name="cashflow_transactions", df=transactions
                 )
-                del (
-                    st.session_state["detailed_transactions_df"],
-                    st.session_state["detailed_transfers_df"],
+                session_cache.invalidate(
+                    "detailed_transactions_df",
+                    "detailed_transfers_df",
+                    "account_transaction_totals_df",
                 )
                 st.rerun()
 
@@ -1409,15 +3156,11 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
         filter_block2 = filters.columns(5)
         account_types_filter = filter_block1[0].multiselect(
             label="Account Types",
-            options=st.session_state["detailed_accounts_df"]["account_type_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_type_name"),
         )
         accounts_filter = filter_block1[1].multiselect(
             label="Account Name",
-            options=st.session_state["detailed_accounts_df"]["account_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_name"),
         )
         date_filter = filter_block1[2].selectbox(
             label="Date Range",
@@ -1444,9 +3187,7 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
             start_date_filter, end_date_filter = datetime(today.year, 1, 1), today
         categories_types_filter = filter_block1[3].multiselect(
             label="Categories",
-            options=st.session_state["categories_df"]["category_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("categories_df", "category_name"),
         )
         transaction_status_filter = filter_block1[4].multiselect(
             label="Transaction Status",
@@ -1472,15 +3213,11 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
         filter_block1 = filters.columns(3)
         origin_account_filter = filter_block1[0].multiselect(
             label="Origin Account",
-            options=st.session_state["detailed_accounts_df"]["account_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_name"),
         )
         destination_account_filter = filter_block1[1].multiselect(
             label="Destination Account",
-            options=st.session_state["detailed_accounts_df"]["account_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_name"),
         )
         date_filter = filter_block1[2].selectbox(
             label="Date Range",
@@ -1515,15 +3252,11 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
         filter_block1 = filters.columns(4, vertical_alignment="bottom")
         account_types_filter = filter_block1[0].multiselect(
             label="Account Types",
-            options=st.session_state["detailed_accounts_df"]["account_type_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_type_name"),
         )
         account_currency_filter = filter_block1[1].multiselect(
             label="Account Currency",
-            options=st.session_state["detailed_accounts_df"]["account_currency"]
-            .sort_values()
-            .unique(),
+            options=option_list("detailed_accounts_df", "account_currency"),
         )
         account_rewards_filter = filter_block1[2].multiselect(
             label="Account Rewards",
@@ -1540,9 +3273,7 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
         filter_block1 = filters.columns(3)
         categories_types_filter = filter_block1[0].multiselect(
             label="Categories",
-            options=st.session_state["categories_df"]["category_name"]
-            .sort_values()
-            .unique(),
+            options=option_list("categories_df", "category_name"),
         )
         date_filter = filter_block1[1].selectbox(
             label="Date Range",
@@ -1600,49 +3331,395 @@ def display_filter_ui(type: str, **kwargs: Any) -> filterArgs:
     return filter_args
 
 
+def load_card_page(
+    type: str,
+    filter_args: filterArgs,
+    current_page: int,
+    max_per_page: int,
+    running_balance_account: Optional[dict] = None,
+) -> pd.DataFrame:
+    """
+    Load one page of cards from the database using keyset pagination.
+    The cursor at the start of each visited page is kept in st.session_state, so moving to the next or a visited page
+    only reads `max_per_page` rows. Cursors are reset when filters or page size change, or after database changes.
+    Running balances of an account are calculated in the database, see `ConnectDB.running_total_page_query()`.
+
+    Parameters
+    ----------
+    type: str, ["transactions","transfers","accounts"]
+        Card UI type, see `card_sources`.
+
+    filter_args: filterArgs
+        Filters to apply, see `filter_condition()`.
+
+    current_page: int
+        Page number to load.
+
+    max_per_page: int
+        Page size.
+
+    running_balance_account: Optional[dict], default=None
+        Account details with `account_id` and `account_starting_balance`, adds `settled_running_balance` and
+        `total_running_balance` columns with the account balance after each row. Only for types with `running_totals`.
+
+    Returns
+    -------
+    `pd.DataFrame` with page rows. Empty DataFrame if any errors.
+    """
+    source = card_sources[type]
+    condition = filter_condition(source["view_name"], **filter_args)
+    view_name = filter_view(source["view_name"], **filter_args)
+    if running_balance_account is not None and "running_totals" not in source:
+        running_balance_account = None
+    partition_condition = (
+        f"{source['partition_col']} = {sql_literal(running_balance_account['account_id'])}"
+        if running_balance_account is not None
+        else None
+    )
+    state_key = f"card_cursors_{type}"
+    # Cursors are also reset after any change to the database, as page boundaries may have moved.
+    signature = (
+        condition,
+        max_per_page,
+        partition_condition,
+        session_cache.invalidation_count(),
+    )
+    if st.session_state.get(state_key, {}).get("signature") != signature:
+        st.session_state[state_key] = {
+            "signature": signature,
+            "cursors": {1: None},
+        }
+    cursors = st.session_state[state_key]["cursors"]
+
+    def page_query(page: int, columns: Optional[List] = None) -> Optional[pd.DataFrame]:
+        if partition_condition is not None:
+            # Running totals sum all earlier rows, so archived years are always read.
+            return db_operations.running_total_page_query(
+                source["view_name"],
+                sort_cols=source["sort_cols"],
+                page_size=max_per_page,
+                running_totals=source["running_totals"],
+                partition_cols=[source["partition_col"]],
+                partition_condition=partition_condition,
+                cursor=cursors[page],
+                condition=condition,
+                descending=source["descending"],
+                columns=columns,
+            )
+        return db_operations.table_page_query(
+            view_name,
+            sort_cols=source["sort_cols"],
+            page_size=max_per_page,
+            cursor=cursors[page],
+            condition=condition,
+            descending=source["descending"],
+            columns=columns,
+        )
+
+    def set_next_cursor(page: int, df: pd.DataFrame) -> None:
+        if len(df) == max_per_page:
+            cursors[page + 1] = tuple(
+                val.item() if hasattr(val, "item") else val
+                for val in df[source["sort_cols"]].iloc[-1]
+            )
+
+    # Jumping ahead walks the skipped pages reading only the cursor columns.
+    page = max(known_page for known_page in cursors if known_page <= current_page)
+    while page < current_page:
+        keys_df = page_query(page, columns=source["sort_cols"])
+        if not isinstance(keys_df, pd.DataFrame) or len(keys_df) < max_per_page:
+            break
+        set_next_cursor(page, keys_df)
+        page += 1
+
+    page_df = page_query(page)
+    if not isinstance(page_df, pd.DataFrame):
+        return pd.DataFrame()
+    set_next_cursor(page, page_df)
+    for col in frame_date_cols.get(source["view_name"], []):
+        page_df[col] = pd.to_datetime(page_df[col])
+    if partition_condition is not None:
+        starting_balance = running_balance_account["account_starting_balance"]
+        page_df["settled_running_balance"] = (
+            starting_balance - page_df["settled_running_sum"]
+        )
+        page_df["total_running_balance"] = (
+            starting_balance - page_df["total_running_sum"]
+        )
+    return page_df
+
+
+def display_grid_ui(page_df: pd.DataFrame, type: str, con: Any) -> None:
+    """
+    Display page rows in a single virtualized dataframe widget, instead of one container per card.
+    Selecting a row opens the same dialog as the card edit button. Transactions and transfers can also be selected
+    together to change their status, see `bulk_update_status()`.
+
+    Parameters
+    ----------
+    page_df: pd.DataFrame
+        Page rows to display, as returned by `load_card_page()`.
+
+    type: str, ["transactions","transfers","accounts"]
+        Grid type based on section, see `grid_columns`.
+
+    con: Any
+        Streamlit container to display the grid in.
+
+    Returns
+    ----------
+    `None`
+    """
+    # The widget key changes after a dialog is opened, so the selection is cleared and the dialog isn't reopened on rerun.
+    grid_key = f"grid_key_{type}"
+    st.session_state[grid_key] = st.session_state.get(grid_key, 0)
+    status_ids = {"transactions": "transaction_ids", "transfers": "transfer_ids"}
+    multi_select = type in status_ids and con.toggle(
+        "Select multiple", key=f"multi_select_{type}"
+    )
+    event = con.dataframe(
+        page_df,
+        column_order=[col for col in grid_columns[type] if col in page_df.columns],
+        column_config=grid_columns[type],
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row" if multi_select else "single-row",
+        key=f"grid_{type}_{multi_select}_{st.session_state[grid_key]}",
+    )
+    if multi_select:
+        selected_ids = (
+            page_df.iloc[event.selection.rows][card_sources[type]["sort_cols"][-1]]
+            .astype(int)
+            .tolist()
+        )
+        status_menu = con.columns([4, 2, 2], vertical_alignment="center")
+        status_menu[0].caption(f"{len(selected_ids)} selected")
+        for i, status in enumerate(["Complete", "Pending"]):
+            if status_menu[i + 1].button(
+                f"Mark {status}",
+                key=f"mark_{status.lower()}_{type}",
+                disabled=len(selected_ids) == 0,
+                use_container_width=True,
+            ):
+                bulk_update_status(status, **{status_ids[type]: selected_ids})
+                st.session_state[grid_key] += 1
+                st.rerun()
+        return
+    if len(event.selection.rows) == 0:
+        return
+    row = page_df.iloc[event.selection.rows[0]].to_dict()
+    st.session_state[grid_key] += 1
+    if type == "transactions":
+        if not pd.isnull(row["transfer_id"]):
+            st.toast("Transfer transactions can be edited from the Transfers tab.")
+        else:
+            transaction_dialog(row)
+    elif type == "transfers":
+        transfer_dialog(row)
+    elif type == "accounts":
+        account_dialog(row)
+
+
+def display_editor_ui(page_df: pd.DataFrame, type: str, con: Any) -> None:
+    """
+    Display page rows in an editable grid. Edits are compared with the page rows, and only changed cells
+    are saved together, see `diff_frames()` and `save_transaction_edits()`.
+
+    Parameters
+    ----------
+    page_df: pd.DataFrame
+        Page rows to edit, as returned by `load_card_page()`.
+
+    type: str, ["transactions"]
+        Editor type based on section, see `editor_columns`.
+
+    con: Any
+        Streamlit container to display the editor in.
+
+    Returns
+    ----------
+    `None`
+    """
+    # Transfer transactions are edited through their transfer, so both transactions stay consistent.
+    transfer_rows = page_df["transfer_id"].notna()
+    if transfer_rows.any():
+        con.caption(f"{int(transfer_rows.sum())} transfer transactions not shown.")
+    # Transactions of archived years are read-only, see `YearArchive.archive_year()`.
+    archived_rows = page_df["transaction_id"].isin(
+        transaction_archive.archived_ids(page_df.loc[~transfer_rows, "transaction_id"])
+    )
+    if archived_rows.any():
+        con.caption(f"{int(archived_rows.sum())} archived transactions not shown.")
+    original_df = page_df.loc[~transfer_rows & ~archived_rows].reset_index(drop=True)
+    column_config = {
+        **editor_columns[type],
+        "transaction_category_name": st.column_config.SelectboxColumn(
+            "Category",
+            options=option_list("categories_df", "category_name"),
+            required=True,
+        ),
+    }
+    editor_key = f"editor_key_{type}"
+    st.session_state[editor_key] = st.session_state.get(editor_key, 0)
+    edited_df = con.data_editor(
+        original_df,
+        column_order=list(column_config.keys()),
+        column_config=column_config,
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        key=f"editor_{type}_{st.session_state[editor_key]}",
+    )
+    editable_cols = [
+        col for col, config in column_config.items() if not config.get("disabled")
+    ]
+    changes_df = diff_frames(original_df, edited_df, "transaction_id", editable_cols)
+    required_cols = [
+        col for col, config in column_config.items() if config.get("required")
+    ]
+    invalid_changes = (
+        changes_df["column"].isin(required_cols) & changes_df["value"].isna()
+    )
+
+    edit_menu = con.columns([4, 2, 2], vertical_alignment="center")
+    changed_rows = changes_df["transaction_id"].nunique()
+    if invalid_changes.any():
+        edit_menu[0].caption(":red[Required values can't be empty.]")
+    else:
+        edit_menu[0].caption(f"{changed_rows} changed rows, {len(changes_df)} cells")
+    if edit_menu[1].button(
+        "Discard Changes",
+        key=f"discard_edits_{type}",
+        disabled=len(changes_df) == 0,
+        use_container_width=True,
+    ):
+        st.session_state[editor_key] += 1
+        st.rerun(scope="fragment")
+    if edit_menu[2].button(
+        "Save Changes",
+        key=f"save_edits_{type}",
+        type="primary",
+        disabled=len(changes_df) == 0 or invalid_changes.any(),
+        use_container_width=True,
+    ):
+        if save_transaction_edits(changes_df):
+            st.session_state[editor_key] += 1
+            session_cache.invalidate(
+                "detailed_transactions_df",
+                "transaction_sub_categories_df",
+                "account_transaction_totals_df",
+                "current_account_balances_df",
+            )
+            st.rerun()
+        else:
+            st.error("Changes couldn't be saved.")
+
+
+@st.fragment
 def display_card_ui(
-    display_df: pd.DataFrame, type: str, default_page_size: int = 10
+    display_df: Optional[pd.DataFrame] = None,
+    type: str = "transactions",
+    default_page_size: int = 10,
+    filter_args: Optional[filterArgs] = None,
+    default_grid_page_size: int = 500,
+    running_balance_account: Optional[dict] = None,
 ) -> None:
     """
     Display UI with cards.
+    Cards paged through the database can also be shown in a high-density grid, see `display_grid_ui()`, or edited in
+    an editable grid, see `display_editor_ui()`.
+    Runs as a fragment, so changing the page, page size or view only reruns the card UI.
 
     Parameters
     ----------
-    display_df: pd.DataFrame
+    display_df: Optional[pd.DataFrame], default=None
         Input DataFrame to iterate through and create Card UI.
+        If `None`, cards are paged through the view for `type` in the database, see `load_card_page()`.
 
     type: str, ["transactions","categories","transfers","accounts"]
         Card UI type based on section.
 
     default_page_size: int, default=10
         Default page size for number of cards to display per page.
+
+    filter_args: Optional[filterArgs], default=None
+        Filters to apply in the database when `display_df` is `None`.
+
+    default_grid_page_size: int, default=500
+        Default page size for number of rows to display per page in grid view.
+
+    running_balance_account: Optional[dict], default=None
+        Account details to show running balances of on transaction cards, see `load_card_page()`.
     """
 
-    block = st.columns(2)
-    left_con = block[0].container()
-    right_con = block[1].container()
-    bottom_menu = st.columns([3, 1, 1])
+    cards_con = st.container()
+    bottom_menu = st.columns([3, 1, 1], vertical_alignment="bottom")
 
-    page_size_options = pd.Series([10, 25, 50])
+    view_mode = "Cards"
+    if display_df is None and type in grid_columns:
+        view_mode = bottom_menu[0].radio(
+            label="View",
+            options=["Cards", "Grid"] + (["Edit"] if type in editor_columns else []),
+            horizontal=True,
+            key=f"view_mode_{type}",
+        )
+    if view_mode in ["Grid", "Edit"]:
+        page_size_options = pd.Series([100, 500, 1000, 5000])
+        default_page_size = default_grid_page_size
+    else:
+        page_size_options = pd.Series([10, 25, 50])
     max_per_page = bottom_menu[1].selectbox(
         label="Per Page",
         options=page_size_options,
         index=get_index(page_size_options, default_page_size),
-        key=f"max_per_page_{type}",
+        key=f"max_per_page_{type}_{view_mode.lower()}",
     )
+    if display_df is None:
+        total_rows = (
+            db_operations.table_count(
+                card_sources[type]["view_name"],
+                filter_condition(
+                    card_sources[type]["view_name"], **(filter_args or {})
+                ),
+            )
+            or 0
+        )
+    else:
+        total_rows = len(display_df)
     total_pages = (
-        math.ceil(len(display_df) / max_per_page)
-        if int(len(display_df) / max_per_page) > 0
+        math.ceil(total_rows / max_per_page)
+        if int(total_rows / max_per_page) > 0
         else 1
     )
     current_page = bottom_menu[2].number_input(
         "Page", min_value=1, max_value=total_pages, step=1, key=f"current_page_{type}"
     )
-    for row in split_frame(
-        display_df.reset_index(drop=True),
-        current_page,
-        max_per_page,
-    ).itertuples():
+    if display_df is None:
+        page_df = load_card_page(
+            type,
+            filter_args or {},
+            current_page,
+            max_per_page,
+            running_balance_account=running_balance_account,
+        )
+    else:
+        page_df = split_frame(
+            display_df.reset_index(drop=True),
+            current_page,
+            max_per_page,
+        ).reset_index(drop=True)
+    if view_mode == "Grid":
+        display_grid_ui(page_df, type, cards_con)
+        return
+    if view_mode == "Edit":
+        display_editor_ui(page_df, type, cards_con)
+        return
+
+    block = cards_con.columns(2)
+    left_con = block[0].container()
+    right_con = block[1].container()
+    for row in page_df.itertuples():
         con = None
         if getattr(row, "Index") % 2 == 0:
             con = left_con.container(border=True)
@@ -1655,15 +3732,14 @@ def display_card_ui(
             line0[1].markdown(row.transaction_merchant_name)
             line0[2].markdown((row.transaction_date).strftime("%b %d %Y"))
 
-            edit_disable = not np.isnan(row.transfer_id)
-            line0[3].button(
+            edit_disable = not pd.isnull(row.transfer_id)
+            if line0[3].button(
                 "✎",
                 key=f"edit_transaction_{row.transaction_id}",
-                on_click=transaction_dialog,
-                args=[row._asdict()],
                 use_container_width=True,
                 disabled=edit_disable,
-            )
+            ):
+                transaction_dialog(row._asdict())
 
             line0[0].markdown(
                 row.transaction_category_logo,
@@ -1679,24 +3755,38 @@ def display_card_ui(
                 )
             line1[0].metric(
                 label=f"{row.transaction_account_name}",
-                value=format_currency(
+                value=format_currency_values(
                     row.transaction_amount, row.transaction_currency, locale="en_US"
                 ),
             )
             status_icon = "⏳" if row.transaction_status == "Pending" else "✅"
             line1[2].text(status_icon)
+            if hasattr(row, "total_running_balance"):
+                con.caption(
+                    "Settled Balance: "
+                    + format_currency_values(
+                        row.settled_running_balance,
+                        row.transaction_currency,
+                        locale="en_US",
+                    )
+                    + " | Total Balance: "
+                    + format_currency_values(
+                        row.total_running_balance,
+                        row.transaction_currency,
+                        locale="en_US",
+                    )
+                )
         elif type == "categories":
             line0 = con.columns([2, 8, 1], vertical_alignment="center")
             if row.category_logo:
                 line0[0].markdown(row.category_logo)
             line0[1].markdown(row.category_name)
-            line0[2].button(
+            if line0[2].button(
                 "✎",
                 key=f"edit_category_{row.category_id}",
-                on_click=category_dialog,
-                args=[row._asdict()],
                 use_container_width=True,
-            )
+            ):
+                category_dialog(row._asdict())
         elif type == "transfers":
             line0 = con.columns([8, 4, 1], vertical_alignment="center")
             line1 = con.columns([5, 5, 1], vertical_alignment="center")
@@ -1704,17 +3794,16 @@ def display_card_ui(
                 f"{row.origin_account_name} -> {row.destination_account_name}"
             )
             line0[1].markdown((row.transfer_date).strftime("%b %d %Y"))
-            line0[2].button(
+            if line0[2].button(
                 "✎",
                 key=f"edit_transfer_{row.transfer_id}",
-                on_click=transfer_dialog,
-                args=[row._asdict()],
                 use_container_width=True,
-            )
+            ):
+                transfer_dialog(row._asdict())
 
             line1[0].metric(
                 label="Sent Amount",
-                value=format_currency(
+                value=format_currency_values(
                     (row.origin_send_amount + row.origin_transfer_charges),
                     row.origin_currency,
                     locale="en_US",
@@ -1722,7 +3811,7 @@ def display_card_ui(
             )
             line1[1].metric(
                 label="Received Amount",
-                value=format_currency(
+                value=format_currency_values(
                     (
                         row.destination_received_amount
                         - row.destination_transfer_charges
@@ -1737,20 +3826,19 @@ def display_card_ui(
             line0 = con.columns([7, 4, 1], vertical_alignment="center")
             line1 = con.columns([6, 4], vertical_alignment="center")
             line0[0].subheader(row.account_name, anchor=False)
-            line0[2].button(
+            if line0[2].button(
                 "✎",
                 key=f"edit_account_{row.account_id}",
-                on_click=account_dialog,
-                args=[row._asdict()],
                 use_container_width=True,
-            )
+            ):
+                account_dialog(row._asdict())
 
             line0[1].markdown(
                 f":gray-background[:blue[{row.account_type_name}]]",
             )
             line1[0].metric(
                 "Current Balance",
-                format_currency(
+                format_currency_values(
                     row.current_account_balance, row.account_currency, locale="en_US"
                 ),
             )
@@ -1769,4 +3857,191 @@ def display_card_ui(
                 st.switch_page("pages/account_reconciliation.py")
 
 
+@st.fragment
+def display_statement_matching_ui(account_details: dict) -> None:
+    """
+    Display UI to upload a bank statement file and match its lines with transactions of an account,
+    see `match_statement()`. Matched pending transactions can be marked as complete together, see `bulk_update_status()`.
+    Runs as a fragment, so choosing columns and tolerance only reruns the matching UI.
+
+    Parameters
+    ----------
+    account_details: dict
+        Account details with `account_name`.
+
+    Returns
+    ----------
+    `None`
+    """
+    statement_file = st.file_uploader(
+        "Bank statement (CSV)", type=["csv"], key="statement_file"
+    )
+    if statement_file is None:
+        return
+    try:
+        raw_statement_df = pd.read_csv(statement_file)
+    except Exception as e:
+        print(e)
+        st.error("Couldn't read the statement file.")
+        return
+    statement_cols = pd.Series(raw_statement_df.columns)
+
+    def guess_col(name: str) -> int:
+        guesses = statement_cols[statement_cols.str.lower().str.contains(name)]
+        return int(guesses.index[0]) if len(guesses) > 0 else 0
+
+    block1 = st.columns(5, vertical_alignment="bottom")
+    date_col = block1[0].selectbox(
+        "Date column", options=statement_cols, index=guess_col("date")
+    )
+    amount_col = block1[1].selectbox(
+        "Amount column", options=statement_cols, index=guess_col("amount")
+    )
+    description_col = block1[2].selectbox(
+        "Description column",
+        options=statement_cols,
+        index=guess_col("desc"),
+    )
+    date_tolerance = block1[3].number_input(
+        "Date tolerance (days)", min_value=0, max_value=30, value=3
+    )
+    debits_negative = block1[4].checkbox("Debits are negative", value=True)
+
+    try:
+        statement_amounts = pd.to_numeric(
+            raw_statement_df[amount_col]
+            .astype(str)
+            .str.replace(r"[^0-9.\-]", "", regex=True),
+            errors="coerce",
+        )
+        statement_df = pd.DataFrame(
+            {
+                "statement_date": pd.to_datetime(
+                    raw_statement_df[date_col], errors="coerce"
+                ),
+                # Transactions store spend as positive amounts.
+                "statement_amount": (
+                    -statement_amounts if debits_negative else statement_amounts
+                ),
+                "statement_description": raw_statement_df[description_col].astype(str),
+            }
+        ).dropna(subset=["statement_date", "statement_amount"])
+    except Exception as e:
+        print(e)
+        st.error("Couldn't read dates and amounts from the selected columns.")
+        return
+    if len(statement_df) == 0:
+        st.warning("No statement lines with valid dates and amounts.")
+        return
+
+    date_range = (
+        statement_df["statement_date"].min() - pd.Timedelta(days=date_tolerance),
+        statement_df["statement_date"].max() + pd.Timedelta(days=date_tolerance),
+    )
+    transactions_df = db_operations.table_query(
+        f"""SELECT transaction_id, transaction_date, transaction_merchant_name, transaction_amount, transaction_status
+        FROM {filter_view("detailed_transactions", date_filter=date_range)}
+        WHERE {filter_condition("detailed_transactions", accounts_filter=[account_details["account_name"]], date_filter=date_range)}"""
+    )
+    if transactions_df is None:
+        st.error("Couldn't load transactions.")
+        return
+    matched_df, unmatched_statement_df, unmatched_transactions_df = match_statement(
+        statement_df, transactions_df, date_tolerance=date_tolerance
+    )
+    pending_ids = matched_df.loc[
+        matched_df["transaction_status"] == "Pending", "transaction_id"
+    ].tolist()
+
+    block2 = st.columns([2, 2, 2, 3], vertical_alignment="bottom")
+    block2[0].metric("Matched", len(matched_df))
+    block2[1].metric("Unmatched Lines", len(unmatched_statement_df))
+    block2[2].metric("Unmatched Transactions", len(unmatched_transactions_df))
+    if block2[3].button(
+        f"Mark {len(pending_ids)} matched as Complete",
+        disabled=len(pending_ids) == 0,
+        type="primary",
+        use_container_width=True,
+    ):
+        bulk_update_status("Complete", transaction_ids=pending_ids)
+        st.rerun()
+
+    matched_tab, statement_tab, transactions_tab = st.tabs(
+        ["Matched", "Unmatched Statement Lines", "Unmatched Transactions"]
+    )
+    matched_tab.dataframe(
+        matched_df,
+        column_order=[
+            "statement_date",
+            "statement_description",
+            "statement_amount",
+            "transaction_date",
+            "transaction_merchant_name",
+            "transaction_status",
+            "match_type",
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+    statement_tab.dataframe(
+        unmatched_statement_df,
+        column_order=["statement_date", "statement_description", "statement_amount"],
+        hide_index=True,
+        use_container_width=True,
+    )
+    transactions_tab.dataframe(
+        unmatched_transactions_df,
+        column_order=[
+            "transaction_date",
+            "transaction_merchant_name",
+            "transaction_amount",
+            "transaction_status",
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+@st.fragment
+def display_filtered_card_ui(
+    filter_type: str,
+    card_type: str,
+    fixed_filter_args: Optional[filterArgs] = None,
+    running_balance_account: Optional[dict] = None,
+    **kwargs: Any,
+) -> None:
+    """
+    Display filter UI and the card UI it filters.
+    Runs as a fragment, so changing a filter only reruns the filters and cards, not the page loading frames.
+
+    Parameters
+    ----------
+    filter_type: str
+        Filter type passed to `display_filter_ui()`.
+
+    card_type: str, ["transactions","transfers","accounts"]
+        Card UI type passed to `display_card_ui()`.
+
+    fixed_filter_args: Optional[filterArgs], default=None
+        Filters always applied on top of the filter UI values.
+
+    running_balance_account: Optional[dict], default=None
+        Account details to show running balances of, passed to `display_card_ui()`.
+
+    **kwargs: Any
+        Additional args passed to `display_filter_ui()`.
+
+    Returns
+    ----------
+    `None`
+    """
+    filter_args = display_filter_ui(type=filter_type, **kwargs)
+    filter_args.update(fixed_filter_args or {})
+    display_card_ui(
+        type=card_type,
+        filter_args=filter_args,
+        running_balance_account=running_balance_account,
+    )
+
+
 curr = Currencies(db_operations)
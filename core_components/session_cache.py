@@ -0,0 +1,436 @@
+import os
+import pickle
+import time
+import uuid
+import toml
+import pandas as pd
+import streamlit as st
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+
+class SessionCache:
+    def __init__(
+        self,
+        config_path: str = ".streamlit/secrets.toml",
+        state_key: str = "session_cache_state",
+    ) -> None:
+        """
+        Initializes class with memory budget and spill directory for DataFrames cached in st.session_state.
+        Values are read from the `session_cache` section of the toml config, defaults are used otherwise.
+
+        Parameters
+        ----------
+        config_path: str, default=".streamlit/secrets.toml"
+            Path of toml config with the `session_cache` section.
+
+        state_key: str, default="session_cache_state"
+            Key in st.session_state used to store cache bookkeeping for the session.
+
+        Returns
+        ----------
+        `None`
+        """
+        try:
+            config = toml.load(config_path).get("session_cache", {})
+        except Exception as e:
+            print(e)
+            config = {}
+        self.memory_budget = int(config.get("memory_budget_mb", 256) * 1024 * 1024)
+        self.spill_enabled = config.get("spill_enabled", True)
+        self.spill_dir = config.get("spill_dir", "files/session_cache")
+        self.max_spill_age = config.get("max_spill_age_hours", 24) * 3600
+        self.state_key = state_key
+
+    def _state(self) -> dict:
+        """
+        Get cache bookkeeping for the current session, creating it if needed.
+
+        Returns
+        -------
+        `dict` with session id, LRU order, frame sizes and spilled frame paths.
+        """
+        if self.state_key not in st.session_state:
+            st.session_state[self.state_key] = {
+                "session_id": uuid.uuid4().hex,
+                "lru": [],
+                "sizes": {},
+                "spilled": {},
+            }
+        return st.session_state[self.state_key]
+
+    def next_data_version(self) -> int:
+        """
+        Get a new data version number, assigned to DataFrames when they are loaded or changed.
+        Results computed from a DataFrame can be cached using its data version, see `ResultCache`.
+
+        Returns
+        -------
+        `int` with data version, unique within the session.
+        """
+        state = self._state()
+        state["data_version"] = state.get("data_version", 0) + 1
+        return state["data_version"]
+
+    def invalidation_count(self) -> int:
+        """
+        Get number of `invalidate()` calls in the session, which follow every change to the database.
+        State derived from database rows outside cached DataFrames, e.g. page cursors, can be reset when it changes.
+
+        Returns
+        -------
+        `int` with number of invalidations.
+        """
+        return self._state().get("invalidations", 0)
+
+    def _frame_size(self, key: str, df: pd.DataFrame) -> int:
+        """
+        Get memory used by a cached DataFrame, only measuring it again if the cached object changed.
+
+        Parameters
+        ----------
+        key: str
+            Key of DataFrame in st.session_state.
+
+        df: pd.DataFrame
+            DataFrame stored under `key`.
+
+        Returns
+        -------
+        `int` with size of DataFrame in bytes.
+        """
+        sizes = self._state()["sizes"]
+        if key not in sizes or sizes[key][0] != id(df):
+            sizes[key] = (id(df), int(df.memory_usage(index=True, deep=True).sum()))
+        return sizes[key][1]
+
+    def _touch(self, key: str) -> None:
+        """
+        Mark a cached DataFrame as most recently used.
+
+        Parameters
+        ----------
+        key: str
+            Key of DataFrame in st.session_state.
+
+        Returns
+        ----------
+        `None`
+        """
+        lru = self._state()["lru"]
+        if key in lru:
+            lru.remove(key)
+        lru.append(key)
+
+    def _spill(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        Write a DataFrame to a columnar file in the spill directory.
+
+        Parameters
+        ----------
+        key: str
+            Key of DataFrame in st.session_state.
+
+        df: pd.DataFrame
+            DataFrame to write.
+
+        Returns
+        -------
+        `True` if DataFrame was written successfully, `False` otherwise.
+        """
+        if not self.spill_enabled:
+            return False
+        try:
+            state = self._state()
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{state['session_id']}_{key}.parquet")
+            df.to_parquet(path, index=True)
+            state["spilled"][key] = path
+            return True
+        except Exception as e:
+            print(e)
+            return False
+
+    def restore(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Read a spilled DataFrame back into memory and remove its spill file.
+
+        Parameters
+        ----------
+        key: str
+            Key of DataFrame in st.session_state.
+
+        Returns
+        -------
+        `pd.DataFrame` with restored values, `None` if the DataFrame was not spilled or any errors.
+        """
+        path = self._state()["spilled"].pop(key, None)
+        if path is None:
+            return None
+        try:
+            df = pd.read_parquet(path)
+            os.remove(path)
+            self._touch(key)
+            return df
+        except Exception as e:
+            print(e)
+            return None
+
+    def invalidate(self, *keys: str) -> None:
+        """
+        Remove DataFrames from st.session_state and discard any spilled copies, so they are reloaded from the database.
+
+        Parameters
+        ----------
+        *keys: str
+            Keys of DataFrames in st.session_state.
+
+        Returns
+        ----------
+        `None`
+        """
+        state = self._state()
+        state["invalidations"] = state.get("invalidations", 0) + 1
+        for key in keys:
+            st.session_state.pop(key, None)
+            state["sizes"].pop(key, None)
+            if key in state["lru"]:
+                state["lru"].remove(key)
+            path = state["spilled"].pop(key, None)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def enforce_budget(self, active_keys: List[str]) -> None:
+        """
+        Spill or evict least recently used DataFrames until the session is within its memory budget.
+        Results cached by `ResultCache` count toward the budget and are evicted first, as they can be recomputed
+        from cached DataFrames. DataFrames used by the current page are marked as recently used and are never spilled.
+
+        Parameters
+        ----------
+        active_keys: List[str]
+            Keys of DataFrames in st.session_state used by the current page.
+
+        Returns
+        ----------
+        `None`
+        """
+        state = self._state()
+        for key in active_keys:
+            if key in st.session_state:
+                self._touch(key)
+
+        cached_keys = [
+            key
+            for key in st.session_state.keys()
+            if key.endswith("_df") and isinstance(st.session_state[key], pd.DataFrame)
+        ]
+        for key in cached_keys:
+            if key not in state["lru"]:
+                state["lru"].insert(0, key)
+        state["lru"] = [key for key in state["lru"] if key in cached_keys]
+        total_size = sum(
+            self._frame_size(key, st.session_state[key]) for key in cached_keys
+        )
+
+        result_states = [
+            st.session_state[key]
+            for key in st.session_state.keys()
+            if key.startswith(ResultCache.key_prefix)
+            and isinstance(st.session_state[key], dict)
+        ]
+        total_size += sum(sum(state["sizes"].values()) for state in result_states)
+        while total_size > self.memory_budget:
+            # Oldest result of the largest cache is evicted first.
+            result_state = max(
+                result_states,
+                key=lambda state: sum(state["sizes"].values()),
+                default=None,
+            )
+            if result_state is None or len(result_state["entries"]) == 0:
+                break
+            result_key, _ = result_state["entries"].popitem(last=False)
+            total_size -= result_state["sizes"].pop(result_key, 0)
+
+        for key in list(state["lru"]):
+            if total_size <= self.memory_budget:
+                break
+            if key in active_keys:
+                continue
+            df = st.session_state[key]
+            total_size -= self._frame_size(key, df)
+            # Frames that can't be spilled are evicted and reloaded from the database when needed.
+            self._spill(key, df)
+            del st.session_state[key]
+            state["sizes"].pop(key, None)
+            state["lru"].remove(key)
+        self.cleanup_stale_spills()
+
+    def cleanup_stale_spills(self) -> None:
+        """
+        Delete spill files older than `self.max_spill_age`, left behind by expired sessions.
+
+        Returns
+        ----------
+        `None`
+        """
+        if not os.path.isdir(self.spill_dir):
+            return
+        now = time.time()
+        for file_name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, file_name)
+            try:
+                if now - os.path.getmtime(path) > self.max_spill_age:
+                    os.remove(path)
+            except Exception as e:
+                print(e)
+
+    def summary(self) -> dict:
+        """
+        Get memory budget and spilled DataFrames for the current session.
+
+        Returns
+        -------
+        `dict` with memory budget in bytes and list of spilled DataFrame keys.
+        """
+        return {
+            "memory_budget": self.memory_budget,
+            "spilled": sorted(self._state()["spilled"].keys()),
+        }
+
+
+class ResultCache:
+    key_prefix = "result_cache_"
+
+    def __init__(self, name: str, max_entries: int = 32) -> None:
+        """
+        Initializes class with a bounded least recently used cache of computed results, stored in st.session_state.
+        Keys should include the data version of the inputs, so outdated results are never returned and age out.
+        Sizes of results are counted toward the memory budget of `SessionCache.enforce_budget()`.
+
+        Parameters
+        ----------
+        name: str
+            Name of cache, used as part of the st.session_state key.
+
+        max_entries: int, default=32
+            Maximum number of results kept, least recently used results are evicted first.
+
+        Returns
+        ----------
+        `None`
+        """
+        self.state_key = f"{self.key_prefix}{name}"
+        self.max_entries = max_entries
+
+    def _state(self) -> dict:
+        """
+        Get cache entries and counters for the current session, creating them if needed.
+
+        Returns
+        -------
+        `dict` with entries in LRU order, their sizes in bytes, hit and miss counters.
+        """
+        if self.state_key not in st.session_state:
+            st.session_state[self.state_key] = {
+                "entries": OrderedDict(),
+                "sizes": {},
+                "hits": 0,
+                "misses": 0,
+            }
+        return st.session_state[self.state_key]
+
+    def _result_size(self, value: Any) -> int:
+        """
+        Get memory used by a result, measured once when it is cached.
+
+        Parameters
+        ----------
+        value: Any
+            Result to measure.
+
+        Returns
+        -------
+        `int` with size of DataFrames in memory, or pickled size of other results, in bytes.
+        """
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            print(e)
+            return 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached result and mark it as most recently used.
+
+        Parameters
+        ----------
+        key: Hashable
+            Key of result.
+
+        Returns
+        -------
+        Cached result, `None` if not cached.
+        """
+        state = self._state()
+        if key in state["entries"]:
+            state["entries"].move_to_end(key)
+            state["hits"] += 1
+            return state["entries"][key]
+        state["misses"] += 1
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Cache a result, evicting least recently used results above `self.max_entries`.
+
+        Parameters
+        ----------
+        key: Hashable
+            Key of result.
+
+        value: Any
+            Result to cache.
+
+        Returns
+        ----------
+        `None`
+        """
+        state = self._state()
+        entries = state["entries"]
+        entries[key] = value
+        entries.move_to_end(key)
+        state["sizes"][key] = self._result_size(value)
+        while len(entries) > self.max_entries:
+            evicted_key, _ = entries.popitem(last=False)
+            state["sizes"].pop(evicted_key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all cached results, counters are kept.
+
+        Returns
+        ----------
+        `None`
+        """
+        state = self._state()
+        state["entries"].clear()
+        state["sizes"].clear()
+
+    def summary(self) -> dict:
+        """
+        Get number and size of cached results, hits and misses for the current session.
+
+        Returns
+        -------
+        `dict` with entries, size in bytes, hits and misses.
+        """
+        state = self._state()
+        return {
+            "entries": len(state["entries"]),
+            "size": sum(state["sizes"].values()),
+            "hits": state["hits"],
+            "misses": state["misses"],
+        }
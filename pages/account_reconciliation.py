@@ -1,43 +1,38 @@
 import streamlit as st
 import pandas as pd
-from babel.numbers import format_currency
 from core_components.functions import (
-    display_filter_ui,
-    display_card_ui,
-    filter_df,
+    display_filtered_card_ui,
     db_operations,
+    load_frames,
+    required_columns,
+    session_cache,
     today,
     account_dialog,
+    format_currency_values,
     get_current_account_balances,
+    add_reconciliation_checkpoint,
+    get_reconciliation_checkpoint,
+    display_statement_matching_ui,
+    bulk_update_status,
 )
 
 
-for table in [
-    "detailed_accounts",
-    "detailed_transactions",
-    "detailed_transfers",
-    "detailed_rewards_accounts",
-]:
-    if f"{table}_df" not in st.session_state:
-        st.session_state[f"{table}_df"] = db_operations.table_query(
-            f"Select * from {table}"
-        )
-
-st.session_state["detailed_transfers_df"]["transfer_date"] = pd.to_datetime(
-    st.session_state["detailed_transfers_df"]["transfer_date"]
-)
-st.session_state["detailed_transactions_df"]["transaction_date"] = pd.to_datetime(
-    st.session_state["detailed_transactions_df"]["transaction_date"]
-)
-st.session_state["current_account_balances_df"]["account_last_reconciled"] = (
-    pd.to_datetime(
-        st.session_state["current_account_balances_df"]["account_last_reconciled"]
-    )
+page_columns = required_columns(
+    "account_balances",
+    "transaction_filters",
+    "transaction_dialog",
+    "account_dialog",
 )
+for table, df in load_frames(page_columns).items():
+    st.session_state[f"{table}_df"] = df
+
 st.session_state["current_account_balances_df"] = get_current_account_balances(
-    st.session_state["detailed_transactions_df"],
+    st.session_state["account_transaction_totals_df"],
     st.session_state["detailed_accounts_df"],
 )
+session_cache.enforce_budget(
+    [f"{table}_df" for table in page_columns] + ["current_account_balances_df"]
+)
 
 block1 = st.columns([6, 2], vertical_alignment="bottom")
 block1[0].title("Reconcile Account", anchor=False)
@@ -72,9 +67,10 @@ if "reconciliation_account" in st.session_state:
                 val=account_details["account_id"],
                 df=reconciliation_df,
             )
-            del (
-                st.session_state["reconciliation_account"],
-                st.session_state["detailed_accounts_df"],
+            add_reconciliation_checkpoint(account_details["account_id"], today.date())
+            del st.session_state["reconciliation_account"]
+            session_cache.invalidate(
+                "detailed_accounts_df", "account_transaction_totals_df"
             )
             st.switch_page("pages/accounts.py")
     block2[2].button(
@@ -87,29 +83,48 @@ if "reconciliation_account" in st.session_state:
     block3 = st.columns([2, 2, 2, 2], vertical_alignment="bottom")
     block3[0].metric(
         label="Settled Balance",
-        value=format_currency(
+        value=format_currency_values(
             account_details["current_account_balance"],
             account_details["account_currency"],
             locale="en_US",
         ),
     )
+    checkpoint = get_reconciliation_checkpoint(account_details["account_id"])
+    if checkpoint is not None:
+        block3[1].metric(
+            label=f"Reconciled Balance ({checkpoint['checkpoint_date'].strftime('%b %d %Y')})",
+            value=format_currency_values(
+                checkpoint["settled_balance"],
+                account_details["account_currency"],
+                locale="en_US",
+            ),
+        )
     block3[2].metric(
         label="Total Balance",
-        value=format_currency(
+        value=format_currency_values(
             account_details["pending_account_balance"],
             account_details["account_currency"],
             locale="en_US",
         ),
     )
 
-    filter_args = display_filter_ui(
-        type="account_reconciliation_filters",
-        last_reconciliation=account_details["account_last_reconciled"],
-    )
-    filter_args["accounts_filter"] = [account_details["account_name"]]
+    with block3[3].popover("Complete Pending", use_container_width=True):
+        complete_date = st.date_input("Up to date", value=today.date())
+        if st.button("Complete pending transactions", type="primary"):
+            bulk_update_status(
+                "Complete",
+                account_id=account_details["account_id"],
+                end_date=complete_date,
+            )
+            st.rerun()
 
-    account_transactions = filter_df(
-        df_name="detailed_transactions_df", **filter_args
-    ).sort_values("transaction_date", ascending=False)
+    with st.expander("Match Bank Statement", icon=":material/receipt_long:"):
+        display_statement_matching_ui(account_details.to_dict())
 
-    display_card_ui(account_transactions, type="transactions")
+    display_filtered_card_ui(
+        filter_type="account_reconciliation_filters",
+        card_type="transactions",
+        fixed_filter_args={"accounts_filter": [account_details["account_name"]]},
+        running_balance_account=account_details.to_dict(),
+        last_reconciliation=account_details["account_last_reconciled"],
+    )
@@ -1,12 +1,17 @@
 import streamlit as st
-from core_components.functions import db_operations, category_dialog, display_card_ui
+from core_components.functions import (
+    load_frames,
+    required_columns,
+    session_cache,
+    category_dialog,
+    display_card_ui,
+)
 
 # Due to unknown limitation, setting values to st.session_state with function defined in another script doesn't always execute.
-for table in ["categories", "detailed_transactions"]:
-    if f"{table}_df" not in st.session_state:
-        st.session_state[f"{table}_df"] = db_operations.table_query(
-            f"Select * from {table}"
-        )
+page_columns = required_columns("category_cards", "category_dialog")
+for table, df in load_frames(page_columns).items():
+    st.session_state[f"{table}_df"] = df
+session_cache.enforce_budget([f"{table}_df" for table in page_columns])
 
 block1 = st.columns([6, 2], vertical_alignment="bottom")
 block1[0].title("Categories")
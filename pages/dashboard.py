@@ -3,13 +3,22 @@ from core_components.functions import (
     curr,
     display_filter_ui,
     db_operations,
-    df_summary,
+    load_frames,
+    load_frame_windows,
+    required_columns,
+    session_cache,
+    account_balances_summary,
+    account_balance_history,
+    balance_history,
+    transaction_archive,
     filter_df,
     filterArgs,
+    figure_cache,
+    figure_cache_key,
+    format_currency_values,
     get_current_account_balances,
-    cumulative_calculation,
+    spend_path_frame,
 )
-from babel.numbers import format_currency
 import plotly.express as px
 from datetime import timedelta
 
@@ -31,174 +40,355 @@ if "initial_db_check" not in st.session_state:
             db_operations.table_create(table)
             db_operations.create_table_trigger(table)
             db_operations.insert_initial_values(table)
+    for table in [
+        "reconciliation_checkpoints",
+        "archive_partitions",
+        "archive_year_summaries",
+    ]:
+        if not db_operations.table_exists(table):
+            db_operations.table_create(table)
+    # Union views of live and archived years are read by the views below.
+    transaction_archive.create_archive_views()
     for view in [
         "detailed_accounts",
         "detailed_transactions",
+        "detailed_live_transactions",
+        "transaction_sub_categories",
         "detailed_transfers",
         "detailed_rewards_accounts",
+        "current_account_balances",
     ]:
         db_operations.create_table_view(view)
+    if not db_operations.table_exists("merchants"):
+        db_operations.table_create("merchants")
+        db_operations.backfill_table("merchants")
+    for trigger in [
+        "insert_merchant_index",
+        "update_merchant_index",
+        "delete_merchant_index",
+        "update_transaction_checkpoints",
+        "delete_transaction_checkpoints",
+        "update_account_checkpoints",
+        "delete_account_checkpoints",
+    ]:
+        db_operations.create_index_trigger(trigger)
+    for index in [
+        "idx_transactions_date",
+        "idx_transactions_account",
+        "idx_transfers_date",
+        "idx_merchants_usage",
+        "idx_transactions_account_status",
+        "idx_checkpoints_account",
+        "idx_archive_summaries_account",
+        "idx_event_logs_table",
+    ]:
+        db_operations.create_table_index(index)
+    db_operations.maintain_event_logs()
     curr.check_and_update_currency_rates()
     st.session_state["initial_db_check"] = "Complete"
 
-for table in [
-    "account_types",
-    "currencies",
-    "currency_rates",
-    "categories",
-    "detailed_accounts",
-    "detailed_transactions",
-    "detailed_transfers",
-    "detailed_rewards_accounts",
-]:
-    if f"{table}_df" not in st.session_state:
-        st.session_state[f"{table}_df"] = db_operations.table_query(
-            f"Select * from {table}"
-        )
+page_columns = required_columns(
+    "account_balances",
+    "transaction_filters",
+    "filtered_transactions",
+    "spend_path",
+    "current_balances",
+    "net_worth",
+    "category_spend",
+)
+for table, df in load_frames(page_columns).items():
+    st.session_state[f"{table}_df"] = df
 
 st.session_state["current_account_balances_df"] = get_current_account_balances(
-    st.session_state["detailed_transactions_df"],
+    st.session_state["account_transaction_totals_df"],
     st.session_state["detailed_accounts_df"],
 )
+session_cache.enforce_budget(
+    [f"{table}_df" for table in page_columns] + ["current_account_balances_df"]
+)
 base_currency = curr.get_base_currency()
-st.title("Personal Finances Dashboard")
-filter_args = display_filter_ui(type="transaction_filters")
-dashboard_viz = st.container()
-block1 = dashboard_viz.columns([8, 3])
-block2 = dashboard_viz.columns(2)
-
-# Spend Path viz
-with block1[0]:
-    st.subheader("Spend Path", anchor=False)
-    spend_path_args = filter_args
-
-    spend_path_df = filter_df(df_name="detailed_transactions_df", **spend_path_args)
-    spend_path_df = cumulative_calculation(spend_path_df)
-    spend_path_df["transaction_amount"] = spend_path_df["transaction_amount"].apply(
-        lambda x: format_currency(x, base_currency)
+
+
+# Lines shown on the spend path chart, each a running total of transactions grouped by column.
+spend_path_groups = {
+    "Total": None,
+    "Account": "transaction_account_name",
+    "Category": "transaction_category_name",
+    "Account Type": "transaction_account_type_name",
+    "Currency": "transaction_currency",
+}
+
+
+@st.fragment
+def spend_path_chart(spend_path_args: filterArgs) -> None:
+    """
+    Display cumulative spend chart, as a single line or one line per account, category, account type or currency.
+    Runs as a fragment, rerun only when its filters or lines change.
+
+    Parameters
+    ----------
+    spend_path_args: filterArgs
+        Filters applied to transactions.
+
+    Returns
+    ----------
+    `None`
+    """
+    line_group = st.selectbox(
+        "Lines",
+        options=list(spend_path_groups.keys()),
+        key="spend_path_lines",
     )
-    spend_path_df["transaction_amount_cumulative_display"] = spend_path_df[
-        "transaction_amount_cumulative"
-    ].apply(lambda x: format_currency(x, base_currency))
-
-    spend_path_fig = px.line(
-        spend_path_df,
-        x="transaction_date",
-        y="transaction_amount_cumulative",
-        markers=True,
-        line_shape="linear",
+    group_col = spend_path_groups[line_group]
+    # Figures are rebuilt only when transactions, filters, lines or base currency change.
+    figure_key = figure_cache_key(
+        "spend_path",
+        "detailed_transactions_df",
+        spend_path_args,
+        base_currency,
+        group_col,
     )
-    spend_path_fig.update_traces(
-        text=spend_path_df[
-            [
+    spend_path_fig = figure_cache.get(figure_key)
+    if spend_path_fig is None:
+        spend_path_df = spend_path_frame(spend_path_args, group_col=group_col)
+        spend_path_df["transaction_amount"] = format_currency_values(
+            spend_path_df["transaction_amount"], base_currency
+        )
+        spend_path_df["transaction_amount_cumulative_display"] = format_currency_values(
+            spend_path_df["transaction_amount_cumulative"], base_currency
+        )
+
+        spend_path_fig = px.line(
+            spend_path_df,
+            x="transaction_date",
+            y="transaction_amount_cumulative",
+            color=group_col,
+            custom_data=[
                 "transaction_merchant_name",
                 "transaction_amount",
                 "transaction_amount_cumulative_display",
-            ]
-        ],
-        hovertemplate="<b>%{text[0]}</b>"
-        + "<br><b>Transaction Amount:</b> %{text[1]}</br>"
-        + "<b>Cumulative Total:</b> %{text[2]}"
-        + "<br><b>Transaction Date:</b> %{x}</br>",
-    )
-    spend_path_fig.update_layout(
-        hoverlabel=dict(bgcolor="#0E1117", font_size=16, font_family="Sans Serif"),
-        xaxis_range=[
-            filter_args["date_filter"][0] - timedelta(1),
-            filter_args["date_filter"][1] + timedelta(1),
-        ],
-        xaxis_title="Transaction Date",
-        yaxis_title=f"Transaction Amount ({base_currency})",
-    )
+            ],
+            markers=True,
+            line_shape="linear",
+            labels={group_col: line_group} if group_col else None,
+        )
+        spend_path_fig.update_traces(
+            hovertemplate="<b>%{customdata[0]}</b>"
+            + "<br><b>Transaction Amount:</b> %{customdata[1]}</br>"
+            + "<b>Cumulative Total:</b> %{customdata[2]}"
+            + "<br><b>Transaction Date:</b> %{x}</br>",
+        )
+        spend_path_fig.update_layout(
+            hoverlabel=dict(bgcolor="#0E1117", font_size=16, font_family="Sans Serif"),
+            xaxis_range=[
+                spend_path_args["date_filter"][0] - timedelta(1),
+                spend_path_args["date_filter"][1] + timedelta(1),
+            ],
+            xaxis_title="Transaction Date",
+            yaxis_title=f"Transaction Amount ({base_currency})",
+        )
+        figure_cache.put(figure_key, spend_path_fig)
     st.plotly_chart(spend_path_fig, use_container_width=True)
 
-# Current Account Balances viz
-with block1[1]:
-    st.subheader("Current Balances", anchor=False)
-    con = st.container(height=400)
-    current_balances_args: filterArgs = {
-        k: filter_args[k] for k in ["date_filter"] if k in filter_args
-    }
 
+@st.fragment
+def current_balances_panel(current_balances_args: filterArgs) -> None:
+    """
+    Display current balance and change within the date filter for each account, or summed by account type.
+    Runs as a fragment, rerun only when its filters or grouping change.
+
+    Parameters
+    ----------
+    current_balances_args: filterArgs
+        Filters applied to transactions, only `date_filter` is used.
+
+    Returns
+    ----------
+    `None`
+    """
+    group_by_type = st.toggle("Group by account type", key="group_balances_by_type")
+    con = st.container(height=400)
     filtered_transactions_df = filter_df(
         df_name="detailed_transactions_df", **current_balances_args
     )
-    delta_total = df_summary(
+    balances_summary_df = account_balances_summary(
+        st.session_state["current_account_balances_df"],
         filtered_transactions_df,
-        "transaction_account_id",
-        "transaction_amount",
-        "delta_transaction_sum",
+        group_by_type=group_by_type,
+        base_currency=base_currency,
+        currency_rates_df=st.session_state["currency_rates_df"],
     )
-    if len(st.session_state["current_account_balances_df"]) > 0:
-        balance_viz_df = st.session_state["current_account_balances_df"].merge(
-            delta_total,
-            left_on="account_id",
-            right_on="transaction_account_id",
-            how="left",
-        )
-        balance_viz_df["delta_transaction_sum"] = balance_viz_df[
-            "delta_transaction_sum"
-        ].fillna(0.00)
-    else:
-        balance_viz_df = st.session_state["current_account_balances_df"]
-        balance_viz_df["delta_transaction_sum"] = None
-
-    for index, row in balance_viz_df.sort_values(
-        ["account_type_name", "account_name"]
-    ).iterrows():
-        current_balance = format_currency(
-            row["current_account_balance"],
-            row["account_currency"],
-            locale="en_US",
-        )
-        balance_delta = format_currency(
-            -row["delta_transaction_sum"],
-            row["account_currency"],
-            locale="en_US",
-        )
-        color_toggle = "off" if -row["delta_transaction_sum"] == 0 else "normal"
+    if balances_summary_df.attrs.get("unconverted_accounts"):
+        con.caption(
+            f"Not included, no {base_currency} conversion rate: "
+            + ", ".join(balances_summary_df.attrs["unconverted_accounts"])
+        )
+    for row in balances_summary_df.itertuples():
         con.metric(
-            label=f"{row['account_name']} :gray-background[:blue[{row['account_type_name']}]]",
-            value=current_balance,
-            delta=balance_delta,
-            delta_color=color_toggle,
-        )
-
-# Category Spend viz
-with block2[0]:
-    st.subheader("Spending by Category", anchor=False)
-    category_spend_args: filterArgs = {
-        k: filter_args[k]
-        for k in [
-            "account_types_filter",
-            "accounts_filter",
-            "transaction_status_filter",
-            "transfers_filter",
-            "inflow_filter",
-            "date_filter",
-        ]
-        if k in filter_args
-    }
-    category_spend_args["transfers_filter"] = False
-
-    category_spend_df = filter_df(
-        df_name="detailed_transactions_df", **category_spend_args
-    ).sort_values("transaction_category_name")
-
-    category_spend_fig = px.bar(
-        category_spend_df, "transaction_category_name", "transaction_amount"
+            label=row.metric_label,
+            value=row.balance_display,
+            delta=row.delta_display,
+            delta_color=row.delta_color,
+        )
+
+
+@st.fragment
+def category_spend_chart(category_spend_args: filterArgs) -> None:
+    """
+    Display spending by category chart. Runs as a fragment, rerun only when its filters change.
+
+    Parameters
+    ----------
+    category_spend_args: filterArgs
+        Filters applied to transactions.
+
+    Returns
+    ----------
+    `None`
+    """
+    figure_key = figure_cache_key(
+        "category_spend", "detailed_transactions_df", category_spend_args, base_currency
     )
-    category_spend_df["transaction_amount"] = category_spend_df[
-        "transaction_amount"
-    ].apply(lambda x: format_currency(x, base_currency))
-    category_spend_fig.update_traces(
-        text=category_spend_df[["transaction_category_name", "transaction_amount"]],
-        hovertemplate="<b>Transaction Category:</b> %{text[0]}"
-        + "<br><b>Transaction Total:</b> %{text[1]}</br>",
+    category_spend_fig = figure_cache.get(figure_key)
+    if category_spend_fig is None:
+        category_spend_df = filter_df(
+            df_name="detailed_transactions_df", **category_spend_args
+        ).sort_values("transaction_category_name")
+
+        category_spend_fig = px.bar(
+            category_spend_df, "transaction_category_name", "transaction_amount"
+        )
+        category_spend_df["transaction_amount"] = format_currency_values(
+            category_spend_df["transaction_amount"], base_currency
+        )
+        category_spend_fig.update_traces(
+            text=category_spend_df[["transaction_category_name", "transaction_amount"]],
+            hovertemplate="<b>Transaction Category:</b> %{text[0]}"
+            + "<br><b>Transaction Total:</b> %{text[1]}</br>",
+        )
+        category_spend_fig.update_layout(
+            hoverlabel=dict(bgcolor="#0E1117", font_size=16, font_family="Sans Serif"),
+            xaxis_title="Transaction Category",
+            yaxis_title=f"Transaction Amount ({base_currency})",
+        )
+        figure_cache.put(figure_key, category_spend_fig)
+    st.plotly_chart(category_spend_fig, use_container_width=True)
+
+
+@st.fragment
+def net_worth_chart() -> None:
+    """
+    Display net worth over time in the base currency, optionally with a line per account.
+    Daily balances come from the balance matrix cached by `balance_history`, so the full history renders without
+    reading transactions. Runs as a fragment, rerun only when its options change.
+
+    Returns
+    ----------
+    `None`
+    """
+    show_accounts = st.toggle("Show accounts", key="net_worth_by_account")
+    history_df = account_balance_history(
+        st.session_state["detailed_accounts_df"],
+        base_currency,
+        st.session_state["currency_rates_df"],
     )
-    category_spend_fig.update_layout(
-        hoverlabel=dict(bgcolor="#0E1117", font_size=16, font_family="Sans Serif"),
-        xaxis_title="Transaction Category",
-        yaxis_title=f"Transaction Amount ({base_currency})",
+    if history_df is None:
+        st.caption("Balance history unavailable.")
+        return
+    if history_df.attrs.get("unconverted_accounts"):
+        st.caption(
+            f"Not included, no {base_currency} conversion rate: "
+            + ", ".join(history_df.attrs["unconverted_accounts"])
+        )
+    # The balance matrix only changes when events are logged, so figures are cached by its last event id.
+    figure_key = (
+        "net_worth",
+        balance_history.history["last_event_id"],
+        len(history_df),
+        tuple(history_df.columns),
+        base_currency,
+        show_accounts,
     )
-    st.plotly_chart(category_spend_fig, use_container_width=True)
+    net_worth_fig = figure_cache.get(figure_key)
+    if net_worth_fig is None:
+        net_worth_df = history_df if show_accounts else history_df.iloc[:, :0]
+        net_worth_df = net_worth_df.assign(**{"Net Worth": history_df.sum(axis=1)})
+        net_worth_fig = px.line(
+            net_worth_df,
+            y=list(net_worth_df.columns),
+            line_shape="hv",
+            render_mode="webgl",
+        )
+        net_worth_fig.update_traces(
+            hovertemplate="<b>%{fullData.name}</b>"
+            + f"<br><b>Balance:</b> %{{y:,.2f}} {base_currency}</br>"
+            + "<b>Date:</b> %{x}",
+        )
+        net_worth_fig.update_layout(
+            hoverlabel=dict(bgcolor="#0E1117", font_size=16, font_family="Sans Serif"),
+            xaxis_title="Date",
+            yaxis_title=f"Balance ({base_currency})",
+            legend_title_text=None,
+        )
+        figure_cache.put(figure_key, net_worth_fig)
+    st.plotly_chart(net_worth_fig, use_container_width=True)
+
+
+@st.fragment
+def dashboard_panels() -> None:
+    """
+    Display filters and the dashboard visualizations depending on them.
+    Runs as a fragment, so changing a filter doesn't reload frames or account balances.
+    Each visualization only receives the filters it depends on.
+
+    Returns
+    ----------
+    `None`
+    """
+    filter_args = display_filter_ui(type="transaction_filters")
+    for table, df in load_frame_windows(
+        {"detailed_transactions": filter_args["date_filter"]}
+    ).items():
+        st.session_state[f"{table}_df"] = df
+    dashboard_viz = st.container()
+    block1 = dashboard_viz.columns([8, 3])
+    block2 = dashboard_viz.columns(2)
+
+    # Spend Path viz
+    with block1[0]:
+        st.subheader("Spend Path", anchor=False)
+        spend_path_chart(filter_args)
+
+    # Current Account Balances viz
+    with block1[1]:
+        st.subheader("Current Balances", anchor=False)
+        current_balances_panel(
+            {k: filter_args[k] for k in ["date_filter"] if k in filter_args}
+        )
+
+    # Category Spend viz
+    with block2[0]:
+        st.subheader("Spending by Category", anchor=False)
+        category_spend_args: filterArgs = {
+            k: filter_args[k]
+            for k in [
+                "account_types_filter",
+                "accounts_filter",
+                "transaction_status_filter",
+                "transfers_filter",
+                "inflow_filter",
+                "date_filter",
+            ]
+            if k in filter_args
+        }
+        category_spend_args["transfers_filter"] = False
+        category_spend_chart(category_spend_args)
+
+    # Net Worth viz
+    with block2[1]:
+        st.subheader("Net Worth", anchor=False)
+        net_worth_chart()
+
+
+st.title("Personal Finances Dashboard")
+dashboard_panels()
@@ -1,13 +1,24 @@
 import streamlit as st
-from core_components.functions import db_operations, curr
+import pandas as pd
+from core_components.functions import (
+    load_frames,
+    required_columns,
+    session_cache,
+    filter_cache,
+    figure_cache,
+    curr,
+    db_operations,
+    frame_memory_usage,
+    set_money_storage,
+    transaction_archive,
+)
 
 base_currency = curr.get_base_currency()
 
-for table in ["currencies"]:
-    if f"{table}_df" not in st.session_state:
-        st.session_state[f"{table}_df"] = db_operations.table_query(
-            f"Select * from {table}"
-        )
+page_columns = required_columns("base_currency")
+for table, df in load_frames(page_columns).items():
+    st.session_state[f"{table}_df"] = df
+session_cache.enforce_budget([f"{table}_df" for table in page_columns])
 
 # To-do, add callback to change base currency and get new rates when changed.
 st.selectbox(
@@ -20,3 +31,171 @@ st.selectbox(
     ),
     disabled=True,
 )
+
+with st.expander("Money Storage", icon=":material/payments:"):
+    money_modes = ["Decimal", "Minor units"]
+    current_mode = money_modes[int(db_operations.money_scale is not None)]
+    st.caption(
+        "Minor units store amounts as whole cents (or the smallest unit of the account currencies), "
+        "so balances and totals are summed without rounding errors."
+    )
+    money_mode = st.radio(
+        label="Store amounts as",
+        options=money_modes,
+        index=money_modes.index(current_mode),
+        horizontal=True,
+        key="money_storage_mode",
+    )
+    if st.button(
+        f"Migrate to {money_mode.lower()}",
+        disabled=money_mode == current_mode,
+        key="money_storage_migrate",
+    ):
+        if set_money_storage(money_mode == "Minor units"):
+            session_cache.invalidate(
+                *[key for key in st.session_state.keys() if key.endswith("_df")],
+                *session_cache.summary()["spilled"],
+            )
+            filter_cache.clear()
+            figure_cache.clear()
+            st.rerun()
+        else:
+            st.error("Migration failed, amounts were not changed.")
+
+with st.expander("Date Storage", icon=":material/calendar_month:"):
+    date_modes = ["Text", "Epoch"]
+    current_mode = date_modes[int(db_operations.epoch_dates)]
+    st.caption(
+        "Epoch storage stores dates as whole days since 1970 (or seconds for timestamps), "
+        "so date filters compare numbers and dates are read without parsing text."
+    )
+    date_mode = st.radio(
+        label="Store dates as",
+        options=date_modes,
+        index=date_modes.index(current_mode),
+        horizontal=True,
+        key="date_storage_mode",
+    )
+    if st.button(
+        f"Migrate to {date_mode.lower()}",
+        disabled=date_mode == current_mode,
+        key="date_storage_migrate",
+    ):
+        if db_operations.set_date_storage(date_mode == "Epoch"):
+            session_cache.invalidate(
+                *[key for key in st.session_state.keys() if key.endswith("_df")],
+                *session_cache.summary()["spilled"],
+            )
+            filter_cache.clear()
+            figure_cache.clear()
+            st.rerun()
+        else:
+            st.error("Migration failed, dates were not changed.")
+
+with st.expander("Transaction Archive", icon=":material/inventory_2:"):
+    st.caption(
+        "Closed years are moved out of the live transactions table. Archived transactions are read-only, "
+        "and their year-end summaries are saved when archived."
+    )
+    summaries_df = transaction_archive.year_summaries()
+    if summaries_df is not None and len(summaries_df) > 0:
+        st.dataframe(
+            summaries_df[
+                [
+                    "archive_year",
+                    "account_name",
+                    "transaction_count",
+                    "transaction_amount_sum",
+                    "transaction_total_sum",
+                ]
+            ],
+            column_config={
+                "archive_year": st.column_config.NumberColumn("Year", format="%d"),
+                "account_name": "Account",
+                "transaction_count": "Transactions",
+                "transaction_amount_sum": "Amount",
+                "transaction_total_sum": "Total",
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+    archive_years = transaction_archive.archivable_years()
+    archive_block = st.columns([3, 2])
+    archive_year = archive_block[0].selectbox(
+        label="Year to archive",
+        options=archive_years,
+        index=None,
+        placeholder=(
+            "Choose a year" if len(archive_years) > 0 else "No closed years to archive"
+        ),
+        key="archive_year",
+    )
+    if archive_block[1].button(
+        f"Archive {archive_year or ''}",
+        disabled=archive_year is None,
+        use_container_width=True,
+        key="archive_year_button",
+    ):
+        if transaction_archive.archive_year(archive_year):
+            session_cache.invalidate(
+                "detailed_transactions_df",
+                "account_transaction_totals_df",
+                "current_account_balances_df",
+            )
+            filter_cache.clear()
+            figure_cache.clear()
+            st.rerun()
+        else:
+            st.error(
+                f"{archive_year} couldn't be archived, complete its pending transactions first."
+            )
+
+with st.expander("Event Log", icon=":material/history:"):
+    event_log_df = db_operations.table_query(
+        "SELECT COUNT(*) AS event_count FROM event_logs"
+    )
+    if event_log_df is not None:
+        st.caption(
+            f"Events: {int(event_log_df['event_count'][0])}, "
+            f"retention: {db_operations.event_log_config.get('retention_days', 365)} days, "
+            f"superseded events compacted after: {db_operations.event_log_config.get('compact_after_days', 30)} days"
+        )
+    if st.button("Compact now", key="event_log_compact"):
+        if db_operations.maintain_event_logs():
+            st.rerun()
+        else:
+            st.error("Event log couldn't be compacted.")
+
+with st.expander("Cached Data", icon=":material/memory:"):
+    cache_summary = session_cache.summary()
+    filter_summary = filter_cache.summary()
+    figure_summary = figure_cache.summary()
+    st.caption(
+        f"Memory budget: {round(cache_summary['memory_budget'] / (1024 * 1024))} MB"
+    )
+    st.caption(
+        f"Filter results cached: {filter_summary['entries']} "
+        f"({round(filter_summary['size'] / (1024 * 1024), 1)} MB), "
+        f"hits: {filter_summary['hits']}, misses: {filter_summary['misses']}"
+    )
+    st.caption(
+        f"Figures cached: {figure_summary['entries']} "
+        f"({round(figure_summary['size'] / (1024 * 1024), 1)} MB), "
+        f"hits: {figure_summary['hits']}, misses: {figure_summary['misses']}"
+    )
+    memory_usage = []
+    for key in sorted(st.session_state.keys()):
+        if key.endswith("_df") and isinstance(st.session_state[key], pd.DataFrame):
+            total_bytes, bytes_per_row = frame_memory_usage(st.session_state[key])
+            memory_usage.append(
+                {
+                    "Data": key,
+                    "Rows": len(st.session_state[key]),
+                    "Total KB": round(total_bytes / 1024, 1),
+                    "Bytes per Row": round(bytes_per_row, 1),
+                    "Status": "In memory",
+                }
+            )
+    for key in cache_summary["spilled"]:
+        memory_usage.append({"Data": key, "Status": "Spilled to disk"})
+    st.dataframe(pd.DataFrame(memory_usage), hide_index=True, use_container_width=True)
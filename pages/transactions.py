@@ -1,34 +1,27 @@
 import streamlit as st
-from core_components.functions import db_operations
-import pandas as pd
 from core_components.functions import (
-    display_card_ui,
-    display_filter_ui,
+    load_frames,
+    required_columns,
+    session_cache,
+    display_filtered_card_ui,
     transaction_dialog,
-    filter_df,
     get_current_account_balances,
 )
 
 
 # Due to unknown limitation, setting values to st.session_state with function defined in another script doesn't always execute.
-for table in [
-    "categories",
-    "detailed_accounts",
-    "detailed_transactions",
-    "detailed_rewards_accounts",
-]:
-    if f"{table}_df" not in st.session_state:
-        st.session_state[f"{table}_df"] = db_operations.table_query(
-            f"Select * from {table}"
-        )
+page_columns = required_columns(
+    "account_balances", "transaction_filters", "transaction_dialog"
+)
+for table, df in load_frames(page_columns).items():
+    st.session_state[f"{table}_df"] = df
 
 st.session_state["current_account_balances_df"] = get_current_account_balances(
-    st.session_state["detailed_transactions_df"],
+    st.session_state["account_transaction_totals_df"],
     st.session_state["detailed_accounts_df"],
 )
-
-st.session_state["detailed_transactions_df"]["transaction_date"] = pd.to_datetime(
-    st.session_state["detailed_transactions_df"]["transaction_date"]
+session_cache.enforce_budget(
+    [f"{table}_df" for table in page_columns] + ["current_account_balances_df"]
 )
 
 block0 = st.columns([6, 2], vertical_alignment="bottom")
@@ -36,8 +29,4 @@ block0[0].title("Transactions")
 block0[1].button(
     "New Transaction", on_click=transaction_dialog, use_container_width=True
 )
-card_ui_args = display_filter_ui(type="transaction_filters")
-transactions_df = filter_df(
-    df_name="detailed_transactions_df", **card_ui_args
-).sort_values("transaction_date", ascending=False)
-display_card_ui(display_df=transactions_df, type="transactions")
+display_filtered_card_ui(filter_type="transaction_filters", card_type="transactions")